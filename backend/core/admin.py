@@ -5,12 +5,15 @@ from .models import User, Poll, Choice, VoteLink, Vote
 class ChoiceInline(admin.TabularInline):
     model = Choice
     extra = 1
-    readonly_fields = ["id", "votes_count"]
-    
-    # Show vote counts
-    def votes_count(self, obj):
-        return obj.votes.count()
-    votes_count.short_description = "Votes"
+    readonly_fields = ["id", "votes"]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_tally()
+
+    # Show vote counts (denormalized on Choice, plus any counter shards)
+    def votes(self, obj):
+        return obj.tally
+    votes.short_description = "Votes"
 
 # Inline for VoteLinks
 class VoteLinkInline(admin.TabularInline):
@@ -21,9 +24,9 @@ class VoteLinkInline(admin.TabularInline):
 # Poll admin
 @admin.register(Poll)
 class PollAdmin(admin.ModelAdmin):
-    list_display = ["title", "created_by", "start_at", "end_at", "is_active", "created_at"]
+    list_display = ["title", "created_by", "start_at", "end_at", "is_active", "state", "counter_shards", "created_at"]
     search_fields = ["title", "description"]
-    list_filter = ["is_active", "start_at", "end_at"]
+    list_filter = ["is_active", "state", "start_at", "end_at"]
     inlines = [ChoiceInline, VoteLinkInline]
 
 # User admin
@@ -36,12 +39,16 @@ class UserAdmin(admin.ModelAdmin):
 # Choice admin (optional)
 @admin.register(Choice)
 class ChoiceAdmin(admin.ModelAdmin):
-    list_display = ["text", "poll", "votes_count"]
+    list_display = ["text", "poll", "votes"]
     search_fields = ["text", "poll__title"]
-    
-    def votes_count(self, obj):
-        return obj.votes.count()
-    votes_count.short_description = "Votes"
+    readonly_fields = ["votes"]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_tally()
+
+    def votes(self, obj):
+        return obj.tally
+    votes.short_description = "Votes"
 
 # VoteLink admin (optional)
 @admin.register(VoteLink)
@@ -0,0 +1,121 @@
+"""
+Native async versions of the hot public endpoints, used instead of the DRF
+views when the app is served over ASGI (ASYNC_VIEWS, see pollify_api/asgi.py).
+
+They return the same JSON and status codes. Reads use the async ORM and the
+async cache API, so a request waiting on the database does not hold a
+worker. Writes that need a transaction (casting a vote) still run through
+sync_to_async, because Django's async ORM has no transaction support.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import serializers
+
+from . import tokens
+from .conditional import aconditional_poll
+from .ingest import is_buffered
+from .models import Poll, QueuedVote
+from .results_cache import aget_or_build
+from .serializers import VoteSerializer
+from .views import build_public_payload, build_results_payload
+
+
+def error(message, code, key="error"):
+    return JsonResponse({key: message}, status=code)
+
+
+class AsyncPublicPollDetailView(View):
+    async def get(self, request, pk):
+        poll = await Poll.objects.only("pk", "is_active", "start_at", "end_at").filter(pk=pk).afirst()
+        if poll is None:
+            return error("No Poll matches the given query.", 404, key="detail")
+
+        async def build():
+            return JsonResponse(
+                await aget_or_build("public-detail", poll.pk, lambda: build_public_payload(poll.pk))
+            )
+
+        return await aconditional_poll(request, poll, "public-detail", build)
+
+
+class AsyncPollByTokenView(View):
+    async def get(self, request):
+        token = request.GET.get("token")
+        if not token:
+            return error("Token is required.", 400)
+
+        link = await tokens.aresolve(token)
+        if link is None:
+            return error("Invalid token.", 404)
+
+        has_voted = link.used or (
+            is_buffered() and await QueuedVote.objects.filter(token=link.token).aexists()
+        )
+
+        async def build():
+            data = dict(
+                await aget_or_build(
+                    "public-detail", link.poll.pk, lambda: build_public_payload(link.poll.pk)
+                )
+            )
+            data["has_voted"] = has_voted
+            return JsonResponse(data)
+
+        return await aconditional_poll(
+            request, link.poll, "by-token", build, extra=has_voted, private=True
+        )
+
+
+class AsyncPollResultsView(View):
+    async def get(self, request):
+        token = request.GET.get("token")
+        if not token:
+            return error("token is required.", 400)
+
+        link = await tokens.aresolve(token)
+        if link is None:
+            return error("Invalid vote link.", 404)
+
+        poll = link.poll
+        if not poll.show_results:
+            return error("Results are not available yet.", 403)
+
+        async def build():
+            return JsonResponse(await aget_or_build("results", poll.id, lambda: build_results_payload(poll)))
+
+        return await aconditional_poll(request, poll, "results", build, private=True)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncVoteCreateView(View):
+    async def post(self, request):
+        if request.content_type == "application/json":
+            try:
+                body = json.loads(request.body or b"{}")
+            except ValueError as exc:
+                return error(f"JSON parse error - {exc}", 400, key="detail")
+            if not isinstance(body, dict):
+                return error("Expected a JSON object.", 400, key="detail")
+        else:
+            body = request.POST
+
+        data = {"votelink": body.get("token"), "choice": body.get("choice_id")}
+        serializer = VoteSerializer(data=data)
+        try:
+            attrs = serializer.to_internal_value(data)
+            link, choice = await VoteSerializer.aresolve_target(attrs["votelink"], attrs["choice"])
+            attrs["choice_obj"], attrs["poll_obj"] = VoteSerializer.check_target(link, choice)
+
+            if is_buffered():
+                await VoteSerializer.aenqueue(attrs)
+                return JsonResponse({"message": "Vote received."}, status=202)
+            await sync_to_async(serializer.create)(attrs)
+        except serializers.ValidationError as exc:
+            # Shape it like is_valid() errors ({"field": ["message"]}).
+            return JsonResponse(serializers.as_serializer_error(exc), status=400)
+        return JsonResponse({"message": "Vote submitted successfully."}, status=201)
@@ -0,0 +1,44 @@
+"""
+Standalone benchmarks for the Pollify backend.
+
+Run from the backend directory, e.g. `python -m core.benchmarks.vote_counters`.
+Each benchmark creates a throwaway test database (SQLite by default, or the
+database in DATABASE_URL) and destroys it when done.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pollify_api.settings")
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Create a test database for the duration of the block.
+
+    SQLite gets a file-backed database (not the shared in-memory one the
+    test runner uses) so concurrent writers behave like production.
+    """
+    from django.db import connection
+
+    settings_dict = connection.settings_dict
+    tmpdir = None
+    if connection.vendor == "sqlite":
+        tmpdir = tempfile.mkdtemp(prefix="pollify-bench-")
+        settings_dict["TEST"]["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+        settings_dict.setdefault("OPTIONS", {})["timeout"] = 60
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
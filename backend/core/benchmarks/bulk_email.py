@@ -0,0 +1,118 @@
+"""
+Messages/sec for bulk invitation email: one send_mail() per recipient versus
+the pooled BulkMailer.
+
+    pip install aiosmtpd
+    python -m core.benchmarks.bulk_email --recipients 2000 --latency 0.005
+    python -m core.benchmarks.bulk_email --host smtp.internal --port 2525
+
+Without --host a local aiosmtpd server is started; --latency makes it wait
+before accepting each message, like a real relay would. The baseline opens
+a connection per message, as SendBulkVoteLinksAPIView used to.
+"""
+import argparse
+import asyncio
+import socket
+import time
+
+from core.benchmarks import setup_django
+
+
+class SlowHandler:
+    def __init__(self, latency):
+        self.latency = latency
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.received += 1
+        return "250 OK"
+
+
+def start_server(latency):
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        raise SystemExit("aiosmtpd is not installed: pip install aiosmtpd (or pass --host/--port).")
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = SlowHandler(latency)
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    return controller, handler
+
+
+def serial(recipients, title):
+    from django.core.mail import send_mail
+
+    for recipient in recipients:
+        send_mail(
+            subject=f"You're invited to vote: {title}",
+            message=f"Hi {recipient['name']},\nVote here: {recipient['link']}",
+            from_email="no-reply@pollify.com",
+            recipient_list=[recipient["email"]],
+            fail_silently=False,
+        )
+
+
+def pooled(recipients, title, workers, batch_size):
+    from core.mailer import BulkMailer
+
+    batches = (recipients[i:i + batch_size] for i in range(0, len(recipients), batch_size))
+    failed = sum(
+        1 for results in BulkMailer(workers=workers, rate=0).send(batches, title)
+        for outcome in results if outcome["error"]
+    )
+    if failed:
+        print(f"  {failed} deliveries failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipients", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the local server waits per message.")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int, default=25)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    controller = None
+    if args.host:
+        host, port = args.host, args.port
+    else:
+        controller, _ = start_server(args.latency)
+        host, port = controller.hostname, controller.port
+    settings.EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+    settings.EMAIL_HOST, settings.EMAIL_PORT = host, port
+    settings.EMAIL_USE_TLS = settings.EMAIL_USE_SSL = False
+    settings.EMAIL_HOST_USER = settings.EMAIL_HOST_PASSWORD = ""
+
+    recipients = [
+        {"email": f"voter{i}@example.com", "name": f"Voter {i}", "link": f"http://bench/vote/{i}"}
+        for i in range(args.recipients)
+    ]
+    runs = [("serial", lambda: serial(recipients, "bench"))]
+    runs += [
+        (f"pooled x{n}", lambda n=n: pooled(recipients, "bench", n, args.batch_size))
+        for n in args.workers
+    ]
+    try:
+        print(f"smtp={host}:{port} recipients={args.recipients} latency={args.latency}s")
+        for label, fn in runs:
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            print(f"{label:>11}  {elapsed:8.2f}s  {args.recipients / elapsed:8.0f} msg/s")
+    finally:
+        if controller:
+            controller.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Links/sec for bulk vote-link generation.
+
+    python -m core.benchmarks.bulk_links
+    python -m core.benchmarks.bulk_links --sizes 10000 100000 --baseline-max 10000
+
+Times validation, chunked bulk_create and NDJSON streaming together. For
+sizes up to --baseline-max it also times the old one-INSERT-per-invitee loop.
+"""
+import argparse
+import time
+
+from core.benchmarks import benchmark_database, setup_django
+
+
+def bulk(poll, invitees):
+    from core.links import issue_vote_links, link_rows, ndjson_lines, validate_invitees
+
+    assert not validate_invitees(invitees)
+    tokens = issue_vote_links(poll, invitees)
+    return sum(len(chunk) for chunk in ndjson_lines(link_rows("http://bench", invitees, tokens)))
+
+
+def per_row(poll, invitees):
+    from core.models import VoteLink
+
+    for person in invitees:
+        VoteLink.objects.create(poll=poll, invitee_email=person["email"], invitee_name=person["name"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--baseline-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database() as connection:
+        from core.models import Poll
+
+        print(f"backend={connection.vendor}")
+        for size in args.sizes:
+            invitees = [{"email": f"voter{i}@example.com", "name": f"Voter {i}"} for i in range(size)]
+            runs = [("bulk", bulk)]
+            if size <= args.baseline_max:
+                runs.append(("per-row", per_row))
+            for label, fn in runs:
+                poll = Poll.objects.create(title=f"bench {label} {size}")
+                start = time.perf_counter()
+                fn(poll, invitees)
+                elapsed = time.perf_counter() - start
+                print(f"{label:>8} {size:>9} links  {elapsed:8.2f}s  {size / elapsed:10.0f} links/s")
+
+
+if __name__ == "__main__":
+    main()
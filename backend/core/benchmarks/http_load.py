@@ -0,0 +1,248 @@
+"""
+HTTP load test of the public vote/poll-read endpoints: sync DRF views under
+gunicorn (WSGI) versus the async views under gunicorn + uvicorn (ASGI).
+
+    python -m core.benchmarks.http_load --workers 2 --concurrency 64 --duration 15
+    python -m core.benchmarks.http_load --db-latency 0.002
+    python -m core.benchmarks.http_load --database-url postgres://.../pollify_bench
+
+Both servers get the same number of worker processes, so they run with
+roughly the same memory (the summed RSS of each server is printed to check).
+The client keeps --concurrency keep-alive connections busy with a mix of
+poll detail, by-token and results reads plus votes (--vote-ratio), and
+reports requests/sec and p50/p99 latency per endpoint.
+
+The database is a temporary SQLite file unless --database-url is given; it
+is migrated and seeded, so point it at a throwaway database. SQLite
+serializes writers, so vote numbers are only meaningful on Postgres.
+--db-latency adds a per-query delay in the servers to mimic a remote
+database; with a local SQLite file there is no I/O wait for async to overlap.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+SERVERS = {
+    "wsgi": ["gunicorn", "pollify_api.wsgi:application"],
+    "asgi": ["gunicorn", "-c", "pollify_api/gunicorn_asgi.py", "pollify_api.asgi:application"],
+}
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def seed(links):
+    import django
+    from datetime import timedelta
+
+    django.setup()
+    from django.core.management import call_command
+    from django.utils import timezone
+    from core.models import Choice, Poll, VoteLink
+
+    call_command("migrate", verbosity=0)
+    now = timezone.now()
+    poll = Poll.objects.create(
+        title="Load test", start_at=now - timedelta(days=1), end_at=now + timedelta(days=30)
+    )
+    choices = Choice.objects.bulk_create(Choice(poll=poll, text=f"Choice {i}") for i in range(4))
+    tokens = [
+        str(link.token)
+        for link in VoteLink.objects.bulk_create((VoteLink(poll=poll) for _ in range(links)), batch_size=5000)
+    ]
+    return str(poll.pk), [str(choice.pk) for choice in choices], tokens
+
+
+def tree_rss_kb(pid):
+    """
+    Resident memory of a process and its children (Linux /proc).
+    """
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                total += next(int(line.split()[1]) for line in status if line.startswith("VmRSS"))
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as children:
+                    pending += [int(child) for child in children.read().split()]
+        except (OSError, StopIteration):
+            continue
+    return total
+
+
+def start_server(mode, port, workers, env):
+    env = {**env, "ASYNC_VIEWS": "True" if mode == "asgi" else "False", "WEB_CONCURRENCY": str(workers)}
+    command = SERVERS[mode] + ["--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--log-level", "warning"]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"{mode} server did not start")
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    length, chunked, close = 0, False, False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value:
+            chunked = True
+        elif name == "connection" and value == "close":
+            close = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status, close
+
+
+class Load:
+    def __init__(self, port, poll_id, choice_ids, tokens, vote_ratio):
+        self.port = port
+        self.poll_id = poll_id
+        self.choice_ids = choice_ids
+        self.tokens = tokens
+        self.read_tokens = tokens[:1000]
+        self.vote_ratio = vote_ratio
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def next_request(self):
+        if self.tokens and random.random() < self.vote_ratio:
+            body = json.dumps({"token": self.tokens.pop(), "choice_id": random.choice(self.choice_ids)})
+            return "vote", "POST", "/api/vote/", body.encode()
+        token = random.choice(self.read_tokens)
+        return random.choice([
+            ("detail", "GET", f"/api/public-polls/{self.poll_id}/", b""),
+            ("by-token", "GET", f"/api/polls/by-token/?token={token}", b""),
+            ("results", "GET", f"/api/poll-results/?token={token}", b""),
+        ])
+
+    async def connection(self, until):
+        reader = writer = None
+        while time.monotonic() < until:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+            name, method, path, body = self.next_request()
+            head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+            if body:
+                head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            start = time.perf_counter()
+            try:
+                writer.write(head.encode() + b"\r\n" + body)
+                await writer.drain()
+                status, close = await read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.statuses[name]["conn-error"] += 1
+                writer.close()
+                writer = None
+                continue
+            self.latencies[name].append(time.perf_counter() - start)
+            self.statuses[name][status] += 1
+            if close:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    async def run(self, concurrency, duration):
+        until = time.monotonic() + duration
+        await asyncio.gather(*(self.connection(until) for _ in range(concurrency)))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(mode, load, duration, rss_kb):
+    total = sum(len(values) for values in load.latencies.values())
+    everything = [value for values in load.latencies.values() for value in values]
+    print(f"\n{mode}: {total / duration:8.0f} req/s  p50={statistics.median(everything) * 1000:6.1f}ms"
+          f"  p99={percentile(everything, 0.99) * 1000:6.1f}ms  rss={rss_kb / 1024:6.1f}MB")
+    for name in sorted(load.latencies):
+        values = load.latencies[name]
+        statuses = " ".join(f"{code}:{count}" for code, count in sorted(load.statuses[name].items(), key=str))
+        print(f"  {name:>9} {len(values) / duration:8.0f} req/s  p50={statistics.median(values) * 1000:6.1f}ms"
+              f"  p99={percentile(values, 0.99) * 1000:6.1f}ms  [{statuses}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=sorted(SERVERS), default=["wsgi", "asgi"])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--vote-ratio", type=float, default=0.1)
+    parser.add_argument("--links", type=int, default=50_000)
+    parser.add_argument("--database-url")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="Seconds added to every server query.")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory(prefix="pollify-load-")
+    env = dict(os.environ)
+    env["DATABASE_URL"] = args.database_url or f"sqlite:///{tmpdir.name}/load.sqlite3"
+    env["DJANGO_SETTINGS_MODULE"] = "core.benchmarks.server_settings"
+    env["BENCH_DB_LATENCY"] = str(args.db_latency)
+    os.environ.update(DATABASE_URL=env["DATABASE_URL"], DJANGO_SETTINGS_MODULE=env["DJANGO_SETTINGS_MODULE"])
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    poll_id, choice_ids, tokens = seed(args.links)
+    share = len(tokens) // len(args.modes)
+    print(f"database={env['DATABASE_URL'].split('@')[-1]} workers={args.workers} "
+          f"concurrency={args.concurrency} duration={args.duration}s vote_ratio={args.vote_ratio} "
+          f"db_latency={args.db_latency}s")
+
+    try:
+        for index, mode in enumerate(args.modes):
+            port = free_port()
+            server = start_server(mode, port, args.workers, env)
+            try:
+                mode_tokens = tokens[index * share:(index + 1) * share]
+                # Warm caches and connections before measuring.
+                asyncio.run(Load(port, poll_id, choice_ids, mode_tokens[:100], 0).run(8, 2))
+                load = Load(port, poll_id, choice_ids, mode_tokens[100:], args.vote_ratio)
+                asyncio.run(load.run(args.concurrency, args.duration))
+                report(mode, load, args.duration, tree_rss_kb(server.pid))
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+    finally:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
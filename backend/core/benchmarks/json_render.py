@@ -0,0 +1,65 @@
+"""
+Render/parse time and size of a large admin payload: DRF's stdlib
+JSONRenderer/JSONParser versus the orjson-backed FastJSONRenderer/Parser.
+
+    python -m core.benchmarks.json_render
+    python -m core.benchmarks.json_render --links 100000 --repeat 3
+
+The payload is PollAdminSerializer output for one poll with --links
+embedded vote links, serialized once; only rendering and parsing are timed.
+"""
+import argparse
+import io
+import time
+
+from core.benchmarks import benchmark_database, setup_django
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--links", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database() as connection:
+        from rest_framework.parsers import JSONParser
+        from rest_framework.renderers import JSONRenderer
+        from core.models import Choice, Poll, VoteLink
+        from core.parsers import FastJSONParser
+        from core.renderers import FastJSONRenderer, orjson
+        from core.serializers import PollAdminSerializer
+
+        poll = Poll.objects.create(title="Render benchmark", description="Admin payload")
+        Choice.objects.bulk_create(Choice(poll=poll, text=f"Choice {i}") for i in range(4))
+        VoteLink.objects.bulk_create(
+            (
+                VoteLink(poll=poll, invitee_email=f"voter{i}@example.com", invitee_name=f"Voter {i}")
+                for i in range(args.links)
+            ),
+            batch_size=5000,
+        )
+        data = PollAdminSerializer(poll).data
+
+        print(f"backend={connection.vendor} links={args.links} orjson={'yes' if orjson else 'no'}")
+        for label, renderer, json_parser in [
+            ("stdlib", JSONRenderer(), JSONParser()),
+            ("orjson", FastJSONRenderer(), FastJSONParser()),
+        ]:
+            render_time, body = best_of(args.repeat, lambda: renderer.render(data))
+            parse_time, _ = best_of(args.repeat, lambda: json_parser.parse(io.BytesIO(body)))
+            print(f"{label:>7}  render {render_time * 1000:8.1f}ms  parse {parse_time * 1000:8.1f}ms"
+                  f"  {len(body) / 1024:9.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
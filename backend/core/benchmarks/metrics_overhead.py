@@ -0,0 +1,55 @@
+"""
+Cost of the request metrics on an admin poll detail request (3 queries),
+by sample rate: without the middleware, and with it at 0, 0.1 and 1.
+
+    python -m core.benchmarks.metrics_overhead
+    python -m core.benchmarks.metrics_overhead --requests 5000
+
+Requests go through the Django test client, so the numbers include the
+full middleware stack and view; only the difference between rows matters.
+"""
+import argparse
+import time
+
+from core.benchmarks import benchmark_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database() as connection:
+        from django.conf import settings
+        from django.test import override_settings
+        from rest_framework.test import APIClient
+        from core.models import Choice, Poll, User
+
+        poll = Poll.objects.create(title="Metrics benchmark")
+        Choice.objects.bulk_create(Choice(poll=poll, text=f"Choice {i}") for i in range(4))
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        url = f"/api/polls/{poll.id}/"
+        without = [m for m in settings.MIDDLEWARE if m != "core.metrics.RequestMetricsMiddleware"]
+
+        print(f"backend={connection.vendor} requests={args.requests}")
+        for label, overrides in [
+            ("no middleware", {"MIDDLEWARE": without}),
+            ("sample 0", {"METRICS_SAMPLE_RATE": 0.0}),
+            ("sample 0.1", {"METRICS_SAMPLE_RATE": 0.1}),
+            ("sample 1", {"METRICS_SAMPLE_RATE": 1.0}),
+        ]:
+            with override_settings(SECURE_SSL_REDIRECT=False, **overrides):
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    for _ in range(args.requests):
+                        client.get(url)
+                    best = min(best, time.perf_counter() - start)
+            print(f"{label:>14}  {best / args.requests * 1e6:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
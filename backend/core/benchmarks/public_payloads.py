@@ -0,0 +1,87 @@
+"""
+Milliseconds per 1k polls to build public poll payloads: PollPublicSerializer
+versus the hand-built payloads in core/payloads.py.
+
+    python -m core.benchmarks.public_payloads
+    python -m core.benchmarks.public_payloads --polls 5000 --choices 8 --repeat 5
+
+Every run includes its queries. "serializer" prefetches choices with
+tallies (as build_public_payload used to); "serializer n+1" is what the
+public list views did, one choices query per poll. Half the polls are
+closed, so vote counts are filled in for those.
+"""
+import argparse
+import time
+
+from core.benchmarks import benchmark_database, setup_django
+
+
+def seed(polls, choices):
+    from datetime import timedelta
+
+    from django.utils import timezone
+    from core.models import Choice, Poll
+
+    now = timezone.now()
+    created = Poll.objects.bulk_create(
+        Poll(
+            title=f"Poll {i}",
+            description="Benchmark poll",
+            start_at=now - timedelta(days=2),
+            end_at=now + timedelta(days=1) if i % 2 else now - timedelta(days=1),
+        )
+        for i in range(polls)
+    )
+    Choice.objects.bulk_create(
+        Choice(poll=poll, text=f"Choice {j}", votes_count=j) for poll in created for j in range(choices)
+    )
+
+
+def serializer(prefetch):
+    from django.db.models import Prefetch
+    from core.models import Choice, Poll
+    from core.serializers import PollPublicSerializer
+
+    def run():
+        polls = Poll.objects.order_by("-created_at")
+        if prefetch:
+            polls = polls.prefetch_related(Prefetch("choices", queryset=Choice.objects.with_tally()))
+        return PollPublicSerializer(polls, many=True).data
+
+    return run
+
+
+def fast_path():
+    from core.models import Poll
+    from core.payloads import POLL_FIELDS, public_poll_payloads
+
+    return public_poll_payloads(Poll.objects.order_by("-created_at").values(*POLL_FIELDS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--polls", type=int, default=1000)
+    parser.add_argument("--choices", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-n-plus-one", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database() as connection:
+        seed(args.polls, args.choices)
+        runs = [("serializer", serializer(prefetch=True)), ("fast path", fast_path)]
+        if not args.skip_n_plus_one:
+            runs.insert(1, ("serializer n+1", serializer(prefetch=False)))
+
+        print(f"backend={connection.vendor} polls={args.polls} choices={args.choices}")
+        for label, fn in runs:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - start)
+            print(f"{label:>15}  {best * 1000 / args.polls * 1000:9.1f} ms per 1k polls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Settings for servers started by the HTTP load test: production settings,
+minus the HTTPS redirect (the load generator speaks plain HTTP).
+
+BENCH_DB_LATENCY (seconds) adds a sleep before every query, to stand in for
+the network round trip to a remote database when benchmarking on SQLite.
+"""
+import os
+import time
+
+from pollify_api.settings import *  # noqa: F401,F403
+
+SECURE_SSL_REDIRECT = False
+
+DB_LATENCY = float(os.environ.get("BENCH_DB_LATENCY", 0))
+
+if DB_LATENCY:
+    from django.db.backends.signals import connection_created
+
+    def _delay(execute, sql, params, many, context):
+        time.sleep(DB_LATENCY)
+        return execute(sql, params, many, context)
+
+    def _add_latency(sender, connection, **kwargs):
+        if _delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(_delay)
+
+    connection_created.connect(_add_latency, weak=False)
@@ -0,0 +1,164 @@
+"""
+EXPLAIN plans and latencies for the time-window poll/vote queries, with and
+without the indexes declared on Poll, VoteLink and Vote.
+
+    python -m core.benchmarks.time_window_indexes               # 100k polls, 1M votes
+    python -m core.benchmarks.time_window_indexes --polls 10000 --votes 100000
+    DATABASE_URL=postgres://... python -m core.benchmarks.time_window_indexes
+"""
+import argparse
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from core.benchmarks import benchmark_database, setup_django
+
+BATCH = 5000
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """
+    Let the seeder write created_at directly instead of auto_now_add.
+    """
+    fields = [model._meta.get_field("created_at") for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def seed(n_polls, n_votes):
+    from django.utils import timezone
+    from core.models import Choice, Poll, Vote, VoteLink
+
+    now = timezone.now()
+    rng = random.Random(42)
+
+    def window():
+        start = now + timedelta(days=rng.uniform(-365, 30))
+        return start, start + timedelta(days=rng.uniform(1, 60))
+
+    with manual_timestamps(Poll, Vote, VoteLink):
+        polls = []
+        for i in range(n_polls):
+            start, end = window()
+            polls.append(Poll(
+                title=f"Poll {i}",
+                start_at=start,
+                end_at=end,
+                is_active=rng.random() < 0.8,
+                created_at=start - timedelta(days=rng.uniform(0, 14)),
+            ))
+        Poll.objects.bulk_create(polls, batch_size=BATCH)
+
+        choices = Choice.objects.bulk_create(
+            (Choice(poll=poll, text=text) for poll in polls for text in ("Yes", "No")),
+            batch_size=BATCH,
+        )
+
+        for offset in range(0, n_votes, BATCH):
+            size = min(BATCH, n_votes - offset)
+            picks = [rng.choice(choices) for _ in range(size)]
+            cast_at = [now - timedelta(days=rng.uniform(0, 30)) for _ in range(size)]
+            links = VoteLink.objects.bulk_create(
+                VoteLink(poll_id=c.poll_id, used=True, used_at=t, created_at=t)
+                for c, t in zip(picks, cast_at)
+            )
+            Vote.objects.bulk_create(
+                Vote(poll_id=c.poll_id, choice=c, votelink=link, created_at=t)
+                for c, link, t in zip(picks, links, cast_at)
+            )
+
+
+def queries():
+    from django.db.models import Q
+    from django.utils import timezone
+    from core.models import Poll, Vote
+    from core.views import PollListView, PublicClosedPollsView
+
+    now = timezone.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        "open polls page": PollListView().get_queryset()[:20],
+        "closed polls page": PublicClosedPollsView().get_queryset()[:20],
+        "votable count": Poll.objects.filter(is_active=True, start_at__lte=now).filter(
+            Q(end_at__gte=now) | Q(end_at__isnull=True)
+        ).values("pk"),
+        "upcoming count": Poll.objects.filter(is_active=True, start_at__gt=now).values("pk"),
+        "closed count": Poll.objects.filter(end_at__lt=now).values("pk"),
+        "recent polls": Poll.objects.filter(created_at__gte=now - timedelta(days=7)).values("pk"),
+        "today's votes": Vote.objects.filter(
+            created_at__gte=today, created_at__lt=today + timedelta(days=1)
+        ).values("pk"),
+    }
+
+
+def measure(repeat):
+    results = {}
+    for name, qs in queries().items():
+        plan = qs.explain()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            len(list(qs.all()))
+            timings.append(time.perf_counter() - start)
+        results[name] = (plan, statistics.median(timings) * 1000)
+    return results
+
+
+def set_indexes(enabled):
+    from django.db import connection
+    from core.models import Poll, Vote, VoteLink
+
+    with connection.schema_editor() as editor:
+        for model in (Poll, VoteLink, Vote):
+            for index in model._meta.indexes:
+                if enabled:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+    elif connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--polls", type=int, default=100_000)
+    parser.add_argument("--votes", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database() as connection:
+        start = time.perf_counter()
+        seed(args.polls, args.votes)
+        print(
+            f"backend={connection.vendor} seeded {args.polls} polls / {args.votes} votes "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+
+        set_indexes(False)
+        before = measure(args.repeat)
+        set_indexes(True)
+        after = measure(args.repeat)
+
+        for name in before:
+            plan_before, ms_before = before[name]
+            plan_after, ms_after = after[name]
+            print(f"\n== {name}: {ms_before:.2f} ms -> {ms_after:.2f} ms")
+            print(f"-- without indexes\n{plan_before}")
+            print(f"-- with indexes\n{plan_after}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Vote throughput with and without sharded choice counters.
+
+    python -m core.benchmarks.vote_counters --writers 64 --votes 4000
+    DATABASE_URL=postgres://... python -m core.benchmarks.vote_counters
+
+Every writer casts votes for the same choice, which is the worst case for a
+single counter row.
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.benchmarks import benchmark_database, setup_django
+
+
+def run(writers, votes, shards):
+    from django.db import OperationalError, connection
+    from core.models import Choice, Poll, VoteLink
+    from core.serializers import VoteSerializer
+
+    poll = Poll.objects.create(title=f"bench shards={shards}", counter_shards=shards)
+    choice = Choice.objects.create(poll=poll, text="hot")
+    links = VoteLink.objects.bulk_create(VoteLink(poll=poll) for _ in range(votes))
+    tokens = [str(link.token) for link in links]
+
+    errors = []
+    lock = threading.Lock()
+
+    def cast(token):
+        try:
+            serializer = VoteSerializer(data={"votelink": token, "choice": str(choice.id)})
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        except OperationalError as exc:
+            with lock:
+                errors.append(str(exc))
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        list(pool.map(cast, tokens))
+    elapsed = time.perf_counter() - start
+
+    tally = Choice.objects.with_tally().get(pk=choice.pk).tally
+    return {
+        "shards": shards,
+        "votes": votes,
+        "counted": tally,
+        "errors": len(errors),
+        "seconds": elapsed,
+        "votes_per_sec": (votes - len(errors)) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=64)
+    parser.add_argument("--votes", type=int, default=4000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 16])
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database() as connection:
+        print(f"backend={connection.vendor} writers={args.writers} votes={args.votes}")
+        for shards in args.shards:
+            r = run(args.writers, args.votes, shards)
+            print(
+                f"shards={r['shards']:>3}  {r['votes_per_sec']:8.1f} votes/s  "
+                f"{r['seconds']:6.2f}s  counted={r['counted']}  errors={r['errors']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Request-scoped "now".
+
+RequestClockMiddleware reads the clock once per request and every poll
+state check made while handling it (Poll.is_votable/show_results, the
+public payloads, ETags, cache timeouts) uses that same instant. One
+request therefore never reports a poll as both open and closed, and a
+list of polls costs one clock read instead of one per property access.
+
+Outside a request (management commands, workers, streamed response
+bodies) `now()` is simply timezone.now().
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils import timezone
+
+_now = ContextVar("request_now", default=None)
+
+
+def now():
+    moment = _now.get()
+    return moment if moment is not None else timezone.now()
+
+
+@contextmanager
+def frozen(moment=None):
+    """
+    Pin `now()` to `moment` (default: the current time) inside the block.
+    """
+    token = _now.set(moment or timezone.now())
+    try:
+        yield
+    finally:
+        _now.reset(token)
+
+
+class RequestClockMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with frozen():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with frozen():
+            return await self.get_response(request)
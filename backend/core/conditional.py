@@ -0,0 +1,98 @@
+"""
+HTTP conditional requests for the public poll endpoints.
+
+ETags are derived from the poll's version stamp (see results_cache) and its
+current state, so a 304 can be answered without serializing anything.
+Responses get a short max-age (longer for closed polls) and are then
+revalidated. Closed polls are not sent as immutable: late buffered votes,
+reopening and choice edits can still change them.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import clock
+from .results_cache import apoll_version, poll_version
+
+def make_etag(*parts):
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def stamp_datetime(version_ns):
+    return datetime.fromtimestamp(version_ns / 1e9, tz=dt_timezone.utc)
+
+
+def last_modified_for(poll, version, now=None):
+    """
+    Latest of the last recorded change and any state transition already
+    passed (the payload flips is_votable/show_results at those moments).
+    """
+    now = now or clock.now()
+    moments = [stamp_datetime(version)]
+    moments += [moment for moment in (poll.start_at, poll.end_at) if moment and moment <= now]
+    return max(moments)
+
+
+def finalize(response, etag, last_modified_ts, max_age=None, private=False):
+    """
+    Set validators and Cache-Control on a 200 or 304 response.
+    """
+    response["ETag"] = etag
+    if last_modified_ts is not None:
+        response["Last-Modified"] = http_date(last_modified_ts)
+    cache_control = {"private" if private else "public": True}
+    if max_age is not None:
+        cache_control.update(max_age=max_age)
+    patch_cache_control(response, **cache_control)
+    return response
+
+
+def conditional(request, etag, last_modified, build, max_age=None, private=False):
+    """
+    Answer 304 if the client's validators match, otherwise call `build()`
+    for the response. Validators and Cache-Control are set on both.
+    """
+    last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if response is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+    return finalize(response, etag, last_modified_ts, max_age, private)
+
+
+def poll_validators(poll, kind, version, extra=""):
+    """
+    (etag, last_modified, max_age) for a single-poll payload.
+    """
+    now = clock.now()
+    state = poll.state_at(now)
+    max_age = settings.CLOSED_POLL_MAX_AGE if state == "closed" else settings.OPEN_POLL_MAX_AGE
+    return make_etag(kind, poll.pk, version, state, extra), last_modified_for(poll, version, now), max_age
+
+
+def conditional_poll(request, poll, kind, build, extra="", private=False):
+    """
+    Conditional response for a single-poll payload.
+    """
+    etag, last_modified, max_age = poll_validators(poll, kind, poll_version(poll.pk), extra)
+    return conditional(request, etag, last_modified, build, max_age=max_age, private=private)
+
+
+async def aconditional_poll(request, poll, kind, build, extra="", private=False):
+    """
+    conditional_poll for async views: `build` is a coroutine function and
+    the version stamp is read with the async cache API.
+    """
+    etag, last_modified, max_age = poll_validators(poll, kind, await apoll_version(poll.pk), extra)
+    last_modified_ts = int(last_modified.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if response is None:
+        response = await build()
+        if response.status_code != 200:
+            return response
+    return finalize(response, etag, last_modified_ts, max_age, private)
@@ -0,0 +1,137 @@
+"""
+Streaming invitee imports from CSV or NDJSON uploads.
+
+The file is read row by row and links are written in chunks of CHUNK_SIZE,
+each in its own transaction, so memory stays flat whatever the file size.
+Emails are deduplicated through a fixed-size Bloom filter; only rows it
+reports as "maybe seen" are checked against the database.
+"""
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.db import transaction
+
+from .bloom import BloomFilter
+from .jobs import JobFailed
+from .links import CHUNK_SIZE, create_links_chunk, invitee_error
+from .models import VoteLink
+from .results_cache import bump_on_commit
+
+FORMATS = ("csv", "ndjson")
+MAX_REPORTED_ERRORS = 50
+
+
+def detect_format(filename, requested=None):
+    if requested:
+        return requested if requested in FORMATS else None
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def iter_rows(fileobj, fmt):
+    """
+    Yield (line_number, row) from a binary file object. Rows that cannot be
+    parsed are yielded as their error message (a str).
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {
+                "email": (row.get("email") or "").strip() or None,
+                "name": (row.get("name") or "").strip() or None,
+            }
+        return
+
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, "invalid JSON."
+
+
+class InviteeDeduper:
+    """
+    Tracks emails seen during one import. Bloom-filter negatives are
+    trusted; positives are confirmed against the pending chunk and then the
+    links this import has already written (created since `since`).
+    """
+
+    def __init__(self, poll, since, capacity=None):
+        self.poll = poll
+        self.since = since
+        self.seen = BloomFilter(capacity or settings.INVITEE_IMPORT_DEDUPE_CAPACITY)
+        self.db_checks = 0
+
+    def is_duplicate(self, email, pending):
+        if email not in self.seen:
+            self.seen.add(email)
+            return False
+        if email in pending:
+            return True
+        self.db_checks += 1
+        return VoteLink.objects.filter(
+            poll=self.poll, invitee_email=email, created_at__gte=self.since
+        ).exists()
+
+
+def import_invitees(job, poll, fileobj, fmt, chunk_size=CHUNK_SIZE):
+    """
+    Create a vote link per valid, not-yet-seen invitee in `fileobj`, updating
+    the (running) `job`'s progress after every chunk, and return a summary.
+    Chunks already written are kept if the file turns out to be unreadable
+    part-way; JobFailed carries the partial summary.
+    """
+    counts = {"created": 0, "duplicates": 0, "invalid": 0}
+    errors = []
+    chunk, pending = [], set()
+    processed = 0
+
+    def flush():
+        with transaction.atomic():
+            create_links_chunk(poll, chunk)
+            bump_on_commit(poll.id)
+        counts["created"] += len(chunk)
+        chunk.clear()
+        pending.clear()
+        job.set_progress(processed)
+
+    def summary():
+        return {**counts, "errors": errors, "db_checks": deduper.db_checks}
+
+    deduper = InviteeDeduper(poll, since=job.started_at)
+    try:
+        for line_number, row in iter_rows(fileobj, fmt):
+            processed += 1
+            error = row if isinstance(row, str) else invitee_error(row)
+            if error:
+                counts["invalid"] += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_number, "error": error})
+                continue
+
+            email = (row.get("email") or "").strip().lower()
+            if email:
+                if deduper.is_duplicate(email, pending):
+                    counts["duplicates"] += 1
+                    continue
+                pending.add(email)
+            chunk.append({"email": email or None, "name": row.get("name")})
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+    except (UnicodeDecodeError, csv.Error) as exc:
+        job.progress = processed
+        raise JobFailed(f"Could not read file: {exc}", summary())
+
+    job.progress = job.total = processed
+    return summary()
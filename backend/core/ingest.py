@@ -0,0 +1,114 @@
+"""
+Buffered vote ingestion.
+
+With VOTE_INGESTION_MODE = "buffered", VoteCreateView validates the token,
+stores the vote in the QueuedVote staging table and answers 202. A worker
+(`manage.py flush_votes`) then moves queued votes into Vote in batches.
+
+Each batch is one transaction: links are claimed with a conditional UPDATE,
+so a token is counted at most once even if the worker dies mid-batch and
+the batch is replayed.
+"""
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from . import tokens
+from .models import QueuedVote, Vote, VoteIngestStats, VoteLink
+from .results_cache import bump_catalog_version, bump_on_commit
+from .rollups import record_vote_batch
+
+
+def is_buffered():
+    return getattr(settings, "VOTE_INGESTION_MODE", "sync") == "buffered"
+
+
+def flush_queued_votes(batch_size=500):
+    """
+    Move up to `batch_size` queued votes into Vote. Returns the number of
+    queue rows processed (counted or discarded).
+    """
+    started = time.perf_counter()
+    with transaction.atomic():
+        batch = list(
+            QueuedVote.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("choice__poll")
+            .order_by("received_at")[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        batch_tokens = [queued.token for queued in batch]
+        unused = set(
+            VoteLink.objects.select_for_update()
+            .filter(token__in=batch_tokens, used=False)
+            .values_list("token", flat=True)
+        )
+        accepted = [queued for queued in batch if queued.token in unused]
+
+        VoteLink.objects.filter(token__in=unused).claim()
+        transaction.on_commit(lambda: tokens.forget(*unused))
+        Vote.objects.bulk_create(
+            Vote(
+                poll_id=queued.poll_id,
+                choice_id=queued.choice_id,
+                votelink_id=queued.token,
+                created_at=queued.received_at,
+            )
+            for queued in accepted
+        )
+
+        per_choice = Counter(queued.choice_id for queued in accepted)
+        choices = {queued.choice_id: queued.choice for queued in accepted}
+        for choice_id, count in per_choice.items():
+            choices[choice_id].record_vote(count)
+        record_vote_batch(accepted)
+        for poll_id in {queued.poll_id for queued in accepted}:
+            bump_on_commit(poll_id)
+        # Late-flushed votes can change results of polls that already closed.
+        transaction.on_commit(bump_catalog_version)
+
+        QueuedVote.objects.filter(token__in=batch_tokens).delete()
+
+    _record_flush(len(batch), len(accepted), time.perf_counter() - started)
+    return len(batch)
+
+
+def _record_flush(processed, counted, seconds):
+    last = dict(last_flush_at=timezone.now(), last_flush_size=processed, last_flush_seconds=round(seconds, 4))
+    rows = VoteIngestStats.objects.filter(pk=1)
+    totals = dict(
+        flushed_total=F("flushed_total") + counted,
+        discarded_total=F("discarded_total") + processed - counted,
+    )
+    if rows.update(**totals, **last):
+        return
+    try:
+        with transaction.atomic():
+            VoteIngestStats.objects.create(
+                pk=1, flushed_total=counted, discarded_total=processed - counted, **last
+            )
+    except IntegrityError:
+        # Another flusher created the row first.
+        rows.update(**totals, **last)
+
+
+def ingest_metrics():
+    oldest = QueuedVote.objects.aggregate(oldest=Min("received_at"))["oldest"]
+    stats = VoteIngestStats.objects.filter(pk=1).values().first() or {}
+    return {
+        "mode": getattr(settings, "VOTE_INGESTION_MODE", "sync"),
+        "queue_depth": QueuedVote.objects.count(),
+        "oldest_queued_seconds": (
+            round((timezone.now() - oldest).total_seconds(), 3) if oldest else 0
+        ),
+        "flushed_total": stats.get("flushed_total", 0),
+        "discarded_total": stats.get("discarded_total", 0),
+        "last_flush_at": stats.get("last_flush_at"),
+        "last_flush_size": stats.get("last_flush_size"),
+        "last_flush_seconds": stats.get("last_flush_seconds"),
+    }
@@ -0,0 +1,167 @@
+"""
+Database-backed job queue for long-running admin operations.
+
+Endpoints `enqueue()` a Job and return its id; `manage.py run_workers`
+claims queued jobs and runs the handler registered for their kind (see
+core/tasks.py). Claiming is a conditional UPDATE, so any number of worker
+processes can share the queue without Redis or row locks.
+
+A running job is leased: its worker refreshes `heartbeat_at` every
+JOB_HEARTBEAT_INTERVAL seconds, and a job whose heartbeat is older than
+JOB_LEASE_SECONDS (its worker was killed) is claimed again by the next
+free worker. Handlers must therefore tolerate being re-run.
+
+Handlers receive the Job, may call `job.set_progress()`, and return a
+JSON-serializable result. Raising JobFailed marks the job failed with a
+message and an optional partial result.
+"""
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+class JobFailed(Exception):
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+def handler(kind):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(kind, payload=None, poll=None, user=None):
+    if kind not in HANDLERS:
+        raise ValueError(f"No job handler registered for '{kind}'.")
+    return Job.objects.create(kind=kind, payload=payload or {}, poll=poll, created_by=user)
+
+
+def claim_next():
+    """
+    Mark the oldest queued job as running and return it, or None if the
+    queue is empty. Running jobs whose lease has expired come first.
+    Losing a race to another worker just moves on.
+    """
+    while True:
+        now = timezone.now()
+        expired = Q(status=Job.RUNNING, heartbeat_at__lt=now - timedelta(seconds=settings.JOB_LEASE_SECONDS))
+        # started_at is kept on reclaim: the invitee import dedupes
+        # against the links written since then, including the dead run's.
+        candidate = Job.objects.filter(expired).order_by("created_at").values_list("pk", flat=True).first()
+        if candidate is not None:
+            if Job.objects.filter(expired, pk=candidate).update(heartbeat_at=now):
+                logger.warning("Reclaimed job %s: its worker stopped sending heartbeats", candidate)
+                return Job.objects.get(pk=candidate)
+            continue
+        candidate = Job.objects.filter(status=Job.QUEUED).order_by("created_at").values_list("pk", flat=True).first()
+        if candidate is None:
+            return None
+        claimed = Job.objects.filter(pk=candidate, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            return Job.objects.get(pk=candidate)
+
+
+@contextmanager
+def heartbeat(job):
+    """
+    Keep the job's lease alive from a background thread while the block
+    runs, so handlers busy in one long step are not reclaimed.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.JOB_HEARTBEAT_INTERVAL):
+                Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"job-heartbeat-{job.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def requeue(job):
+    """
+    Put a finished job back on the queue. Returns False if it is still
+    queued or running.
+    """
+    requeued = Job.objects.filter(pk=job.pk, status__in=[Job.SUCCEEDED, Job.FAILED]).update(
+        status=Job.QUEUED, error="", started_at=None, heartbeat_at=None, finished_at=None
+    )
+    if requeued:
+        job.refresh_from_db()
+    return bool(requeued)
+
+
+def run(job):
+    try:
+        with heartbeat(job):
+            result = HANDLERS[job.kind](job)
+    except JobFailed as exc:
+        job.fail(exc, exc.result)
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        job.fail(f"{type(exc).__name__}: {exc}")
+    else:
+        job.finish(result)
+    return job
+
+
+def run_next():
+    job = claim_next()
+    return run(job) if job else None
+
+
+def run_pending():
+    """
+    Run queued jobs in this process until none are left. Returns how many ran.
+    """
+    count = 0
+    while run_next():
+        count += 1
+    return count
+
+
+def input_path(job, extension):
+    return f"jobs/{job.pk}/input.{extension}"
+
+
+def output_path(job, extension):
+    return f"jobs/{job.pk}/output.{extension}"
+
+
+def save_output(job, chunks, extension):
+    """
+    Spool an iterable of text chunks to a temporary file and store it as the
+    job's output. Returns the storage path.
+    """
+    with tempfile.TemporaryFile() as spool:
+        for chunk in chunks:
+            spool.write(chunk.encode())
+        spool.seek(0)
+        return default_storage.save(output_path(job, extension), File(spool))
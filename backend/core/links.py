@@ -0,0 +1,116 @@
+"""
+Bulk vote-link issuance shared by the bulk-generate endpoint, invitee imports
+and background jobs.
+"""
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .models import VoteLink
+from .results_cache import bump_on_commit
+from .rollups import record_links_issued
+
+CHUNK_SIZE = 1000
+NAME_MAX_LENGTH = VoteLink._meta.get_field("invitee_name").max_length
+
+
+def invitee_error(person):
+    """
+    Return why an invitee entry is invalid, or None.
+    """
+    if not isinstance(person, dict):
+        return "must be an object."
+    email = person.get("email")
+    name = person.get("name")
+    if email:
+        if not isinstance(email, str):
+            return "email must be a string."
+        try:
+            validate_email(email)
+        except ValidationError:
+            return f"'{email}' is not a valid email address."
+    if name is not None and (not isinstance(name, str) or len(name) > NAME_MAX_LENGTH):
+        return f"name must be a string of at most {NAME_MAX_LENGTH} characters."
+    return None
+
+
+def validate_invitees(invitees, limit=20):
+    """
+    Check every entry before anything is written. Returns up to `limit`
+    errors as {"index": i, "error": message}.
+    """
+    errors = []
+    for index, person in enumerate(invitees):
+        error = invitee_error(person)
+        if error:
+            errors.append({"index": index, "error": error})
+            if len(errors) >= limit:
+                break
+    return errors
+
+
+def create_links_chunk(poll, invitees):
+    """
+    bulk_create one chunk of links and return them. Call inside a transaction.
+    """
+    links = VoteLink.objects.bulk_create(
+        VoteLink(poll=poll, invitee_email=person.get("email") or None, invitee_name=person.get("name"))
+        for person in invitees
+    )
+    record_links_issued(poll.id, len(links))
+    return links
+
+
+def issue_vote_links(poll, invitees, chunk_size=CHUNK_SIZE):
+    """
+    Create one VoteLink per (pre-validated) invitee in chunked bulk inserts,
+    all in one transaction. Returns the tokens in input order.
+    """
+    tokens = []
+    with transaction.atomic():
+        for start in range(0, len(invitees), chunk_size):
+            links = create_links_chunk(poll, invitees[start:start + chunk_size])
+            tokens.extend(link.token for link in links)
+        bump_on_commit(poll.id)
+    return tokens
+
+
+def link_rows(base_url, invitees, tokens):
+    for person, token in zip(invitees, tokens):
+        yield {
+            "token": str(token),
+            "email": person.get("email"),
+            "name": person.get("name"),
+            "url": f"{base_url}/vote/{token}",
+        }
+
+
+def ndjson_lines(rows, rows_per_chunk=500):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row) + "\n")
+        if len(lines) >= rows_per_chunk:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+CSV_FIELDS = ["token", "email", "name", "url"]
+
+
+def csv_lines(rows, rows_per_chunk=500):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,200 @@
+"""
+Live tallies over Server-Sent Events.
+
+One in-process Broadcaster thread watches every poll that has subscribers.
+Each tick (LIVE_RESULTS_INTERVAL) it reads the tallies of all watched polls
+in a single query, diffs them against the previous tick, and hands the
+changes to every subscriber. Database work therefore depends on the number
+of watched polls, not on the number of viewers.
+
+Subscribers merge changes they have not sent yet, so a slow client gets
+one coalesced delta instead of a backlog. Streams are served only under
+ASGI (aevent_stream), where waiting holds no worker. Under WSGI each
+request gets one snapshot and the browser polls (poll_response_body).
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .models import Choice
+
+logger = logging.getLogger(__name__)
+
+
+def read_tallies(poll_ids):
+    """
+    {poll_id: {choice_id: votes}} for the given polls, in one query.
+    """
+    tallies = {poll_id: {} for poll_id in poll_ids}
+    rows = Choice.objects.filter(poll_id__in=poll_ids).with_tally().values_list("poll_id", "id", "tally")
+    for poll_id, choice_id, votes in rows:
+        tallies[poll_id][str(choice_id)] = votes
+    return tallies
+
+
+class Subscriber:
+    def __init__(self, poll_id, loop=None):
+        self.poll_id = poll_id
+        self.loop = loop
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.ready = asyncio.Event() if loop else threading.Event()
+
+    def offer(self, changes):
+        """
+        Merge {choice_id: (votes, delta)} into what is waiting to be sent.
+        Called from the broadcaster thread.
+        """
+        with self.lock:
+            for choice_id, (votes, delta) in changes.items():
+                previous = self.pending.get(choice_id, (0, 0))[1]
+                self.pending[choice_id] = (votes, previous + delta)
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.ready.set)
+        else:
+            self.ready.set()
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.ready.clear()
+        return pending
+
+
+class Broadcaster:
+    def __init__(self, interval=None, autostart=True):
+        self.interval = interval
+        self.autostart = autostart
+        self.subscribers = defaultdict(set)
+        self.tallies = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def subscribe(self, poll_id, loop=None):
+        """
+        Register a subscriber and return (subscriber, current tallies). The
+        snapshot comes from the last tick when the poll is already watched.
+        """
+        subscriber = Subscriber(poll_id, loop)
+        with self.lock:
+            snapshot = self.tallies.get(poll_id)
+        if snapshot is None:
+            snapshot = read_tallies([poll_id])[poll_id]
+        with self.lock:
+            self.subscribers[poll_id].add(subscriber)
+            self.tallies.setdefault(poll_id, snapshot)
+            if self.autostart and self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="live-results", daemon=True)
+                self.thread.start()
+        return subscriber, dict(snapshot)
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            watchers = self.subscribers.get(subscriber.poll_id)
+            if watchers is not None:
+                watchers.discard(subscriber)
+                if not watchers:
+                    del self.subscribers[subscriber.poll_id]
+                    self.tallies.pop(subscriber.poll_id, None)
+
+    def tick(self):
+        """
+        Read all watched polls once and push changes to their subscribers.
+        """
+        with self.lock:
+            poll_ids = list(self.subscribers)
+        if not poll_ids:
+            return
+        fresh = read_tallies(poll_ids)
+        for poll_id, tallies in fresh.items():
+            with self.lock:
+                if poll_id not in self.subscribers:
+                    continue
+                previous = self.tallies.get(poll_id, {})
+                self.tallies[poll_id] = tallies
+                watchers = list(self.subscribers[poll_id])
+            changes = {
+                choice_id: (votes, votes - previous.get(choice_id, 0))
+                for choice_id, votes in tallies.items()
+                if votes != previous.get(choice_id)
+            }
+            if changes:
+                for subscriber in watchers:
+                    subscriber.offer(changes)
+
+    def run(self):
+        interval = self.interval or settings.LIVE_RESULTS_INTERVAL
+        try:
+            while True:
+                time.sleep(interval)
+                with self.lock:
+                    if not self.subscribers:
+                        self.thread = None
+                        return
+                try:
+                    self.tick()
+                except Exception:
+                    logger.exception("Live results tick failed")
+        finally:
+            connections.close_all()
+
+
+broadcaster = Broadcaster()
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def snapshot_event(poll_id, tallies):
+    results = [{"choice_id": choice_id, "votes": votes} for choice_id, votes in tallies.items()]
+    return sse("snapshot", {"poll_id": str(poll_id), "results": results})
+
+
+def tally_event(changes):
+    results = [
+        {"choice_id": choice_id, "votes": votes, "delta": delta}
+        for choice_id, (votes, delta) in changes.items()
+    ]
+    return sse("tally", {"results": results})
+
+
+def poll_response_body(poll_id):
+    """
+    WSGI fallback: a single snapshot whose `retry` makes the browser's
+    EventSource reconnect after LIVE_RESULTS_POLL_INTERVAL, i.e. short
+    polling. A held-open stream would tie up a sync worker per viewer.
+    """
+    retry = int(settings.LIVE_RESULTS_POLL_INTERVAL * 1000)
+    return f"retry: {retry}\n\n" + snapshot_event(poll_id, read_tallies([poll_id])[poll_id])
+
+
+async def aevent_stream(poll_id, source=None):
+    """
+    SSE generator for ASGI: a snapshot, then coalesced deltas, with
+    keep-alive comments, for up to LIVE_RESULTS_STREAM_SECONDS (the
+    browser reconnects after `retry`). Waiting holds no thread or worker.
+    """
+    source = source or broadcaster
+    subscriber, snapshot = await sync_to_async(source.subscribe)(poll_id, asyncio.get_running_loop())
+    try:
+        yield "retry: 3000\n\n" + snapshot_event(poll_id, snapshot)
+        deadline = time.monotonic() + settings.LIVE_RESULTS_STREAM_SECONDS
+        while time.monotonic() < deadline:
+            try:
+                await asyncio.wait_for(subscriber.ready.wait(), settings.LIVE_RESULTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            changes = subscriber.take()
+            if changes:
+                yield tally_event(changes)
+    finally:
+        source.unsubscribe(subscriber)
@@ -0,0 +1,145 @@
+"""
+Bulk invitation email over pooled backend connections.
+
+Each worker thread opens one connection (`get_connection()`) and reuses it
+for every message it sends, instead of one connection per `send_mail()`.
+Threads share a rate limiter, and a failure only affects its own
+recipient: transient errors (dropped connections, timeouts, 4xx replies)
+are retried on a fresh connection, permanent ones are reported.
+
+This module does no database work; the `send_vote_links` job persists the
+per-recipient outcomes.
+"""
+import smtplib
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.mail import BadHeaderError, EmailMessage, get_connection
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 1/per_second apart across all threads (0 = no limit).
+    """
+
+    def __init__(self, per_second):
+        self.interval = 1 / per_second if per_second else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def invitation_message(recipient, poll_title, connection=None):
+    return EmailMessage(
+        subject=f"You're invited to vote: {poll_title}",
+        body=f"Hi {recipient.get('name') or 'Guest'},\nVote here: {recipient['link']}",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[recipient["email"]],
+        connection=connection,
+    )
+
+
+def is_permanent(exc):
+    if isinstance(exc, (BadHeaderError, ValueError, smtplib.SMTPRecipientsRefused)):
+        return True
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code >= 500
+
+
+class BulkMailer:
+    def __init__(self, workers=None, rate=None, max_attempts=None, retry_delay=0.5, backend=None):
+        self.workers = workers or settings.BULK_EMAIL_WORKERS
+        self.limiter = RateLimiter(settings.BULK_EMAIL_RATE if rate is None else rate)
+        self.max_attempts = max_attempts or settings.BULK_EMAIL_MAX_ATTEMPTS
+        self.retry_delay = retry_delay
+        self.backend = backend
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = get_connection(self.backend, fail_silently=False)
+            connection.open()
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _reset_connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+            with self._connections_lock:
+                self._connections.remove(connection)
+            self._local.connection = None
+
+    def send_one(self, recipient, poll_title):
+        """
+        Deliver one message, retrying transient failures. Returns
+        (error or None, attempts).
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            self.limiter.wait()
+            try:
+                connection = self._connection()
+                connection.send_messages([invitation_message(recipient, poll_title, connection)])
+                return None, attempt
+            except Exception as exc:
+                if is_permanent(exc) or attempt == self.max_attempts:
+                    return f"{type(exc).__name__}: {exc}", attempt
+                self._reset_connection()
+                time.sleep(self.retry_delay * attempt)
+
+    def send_batch(self, batch, poll_title):
+        results = []
+        for recipient in batch:
+            error, attempts = self.send_one(recipient, poll_title)
+            results.append({"key": recipient.get("key"), "error": error, "attempts": attempts})
+        return results
+
+    def send(self, batches, poll_title):
+        """
+        Send an iterable of recipient batches (dicts with email, name, link
+        and an optional key) and yield each batch's results as it finishes.
+        At most two batches per worker are in flight, so `batches` can be a
+        lazy generator over any number of recipients.
+        """
+        try:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="mailer") as pool:
+                pending = set()
+                for batch in batches:
+                    pending.add(pool.submit(self.send_batch, batch, poll_title))
+                    if len(pending) >= self.workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+        finally:
+            self.close()
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
@@ -0,0 +1,26 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Poll
+from core.rollups import backfill
+
+
+class Command(BaseCommand):
+    help = "Rebuild the hourly analytics rollups from Vote and VoteLink rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll",
+            help="Limit the rebuild to a single poll id.",
+        )
+
+    def handle(self, *args, **options):
+        poll = None
+        if options["poll"]:
+            try:
+                poll = Poll.objects.get(pk=options["poll"])
+            except (Poll.DoesNotExist, ValidationError):
+                raise CommandError(f"Poll {options['poll']} does not exist.")
+
+        written = backfill(poll)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} hourly rollup rows."))
@@ -0,0 +1,41 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import FORMATS, ExportUnavailable, export_votes
+from core.models import Poll
+
+
+class Command(BaseCommand):
+    help = "Stream a poll's votes with their choice and invitee as CSV, NDJSON or Parquet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("poll", help="Poll id.")
+        parser.add_argument("--output", choices=list(FORMATS), default="csv")
+        parser.add_argument("--file", help="Write to this file instead of stdout (required for Parquet).")
+        parser.add_argument("--chunk-size", type=int, help="Rows fetched per round trip.")
+
+    def handle(self, *args, **options):
+        try:
+            poll = Poll.objects.only("pk").filter(pk=options["poll"]).first()
+        except ValidationError:
+            poll = None
+        if poll is None:
+            raise CommandError(f"Poll {options['poll']} does not exist.")
+        if options["output"] == "parquet" and not options["file"]:
+            raise CommandError("Parquet is binary; pass --file.")
+        try:
+            chunks = export_votes(poll, options["output"], options["chunk_size"])
+        except ExportUnavailable as exc:
+            raise CommandError(str(exc))
+
+        if not options["file"]:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending="")
+            return
+
+        written = 0
+        with open(options["file"], "wb") as out:
+            for chunk in chunks:
+                out.write(chunk)
+                written += len(chunk)
+        self.stderr.write(f"Wrote {written} bytes to {options['file']}.")
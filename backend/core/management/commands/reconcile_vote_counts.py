@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.models import Choice, ChoiceCounterShard, Vote
+from core.results_cache import bump_on_commit
+
+
+class Command(BaseCommand):
+    help = "Rebuild Choice.votes_count from Vote rows and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drift, do not write corrected counts.",
+        )
+        parser.add_argument(
+            "--poll",
+            help="Limit reconciliation to a single poll id.",
+        )
+        parser.add_argument(
+            "--fold-shards",
+            action="store_true",
+            help="Also fold counter shards back into votes_count for choices without drift.",
+        )
+
+    def handle(self, *args, **options):
+        fresh = (
+            Vote.objects.filter(choice=OuterRef("pk"))
+            .values("choice")
+            .annotate(n=Count("id"))
+            .values("n")
+        )
+        choices = Choice.objects.with_tally().annotate(
+            actual=Coalesce(Subquery(fresh), 0),
+            shard_rows=Exists(ChoiceCounterShard.objects.filter(choice=OuterRef("pk"))),
+        )
+        if options["poll"]:
+            choices = choices.filter(poll_id=options["poll"])
+
+        drifted = []
+        to_fix = []
+        polls = set()
+        checked = 0
+        for choice in choices.only("id", "poll_id", "text", "votes_count").iterator(chunk_size=2000):
+            checked += 1
+            if choice.tally != choice.actual:
+                self.stdout.write(
+                    f"{choice.id} '{choice.text}': stored={choice.tally} actual={choice.actual}"
+                )
+                drifted.append(choice.pk)
+                to_fix.append(choice.pk)
+                polls.add(choice.poll_id)
+            elif options["fold_shards"] and choice.shard_rows:
+                to_fix.append(choice.pk)
+                polls.add(choice.poll_id)
+
+        if to_fix and not options["dry_run"]:
+            with transaction.atomic():
+                # Lock shard rows first so in-flight votes either land before the
+                # recount or recreate their shard after the delete.
+                shards = ChoiceCounterShard.objects.filter(choice_id__in=to_fix)
+                list(shards.select_for_update().values_list("pk", flat=True))
+                # Recount inside the UPDATE so votes cast since the scan are not lost.
+                Choice.objects.filter(pk__in=to_fix).update(
+                    votes_count=Coalesce(Subquery(fresh), 0)
+                )
+                shards.delete()
+                # Queryset writes send no signals, so cached tallies are
+                # invalidated here.
+                for poll_id in polls:
+                    bump_on_commit(poll_id)
+
+        action = "found" if options["dry_run"] else "fixed"
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {checked} choices, {action} drift on {len(drifted)}.")
+        )
@@ -0,0 +1,56 @@
+import signal
+import threading
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from core.scheduler import LifecycleScheduler
+
+
+class Command(BaseCommand):
+    help = "Apply poll open/close transitions as they happen and freeze results when polls close."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rescan",
+            type=float,
+            default=30.0,
+            help="Seconds between full rescans for new or edited polls.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Rescan once, apply what is due and exit instead of running forever.",
+        )
+
+    def handle(self, *args, **options):
+        rescan = timedelta(seconds=options["rescan"])
+        # Transitions are queued for twice the rescan period, so one that is
+        # due before the next rescan is always already in the heap.
+        scheduler = LifecycleScheduler(horizon=2 * rescan)
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+
+        changed = 0
+        next_rescan = timezone.now()
+        try:
+            while not stop.is_set():
+                now = timezone.now()
+                if now >= next_rescan:
+                    changed += scheduler.rescan(now)
+                    next_rescan = now + rescan
+                changed += scheduler.run_due(now)
+                if options["once"]:
+                    break
+                wake = next_rescan
+                due = scheduler.next_due()
+                if due is not None:
+                    # Polls close strictly after end_at.
+                    wake = min(wake, due + timedelta(milliseconds=1))
+                stop.wait(max(0, (wake - timezone.now()).total_seconds()))
+        finally:
+            connections.close_all()
+        self.stdout.write(self.style.SUCCESS(f"Applied {changed} poll state changes."))
@@ -0,0 +1,76 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import run_next
+
+
+def work(stop, interval, once):
+    """
+    Worker process loop: run queued jobs until told to stop (or, with
+    `once`, until the queue is empty).
+    """
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop.set())
+    processed = 0
+    try:
+        while not stop.is_set():
+            if run_next():
+                processed += 1
+                continue
+            if once:
+                break
+            stop.wait(interval)
+    finally:
+        connections.close_all()
+    return processed
+
+
+class Command(BaseCommand):
+    help = "Run background jobs (link generation, imports, emails, reconciliation) from the Job queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Worker processes to start. 0 runs jobs in this process.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds a worker sleeps when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue once and exit instead of running forever.",
+        )
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context("fork")
+        stop = context.Event()
+        interval, once = options["interval"], options["once"]
+
+        if options["workers"] <= 0:
+            processed = work(stop, interval, once)
+            self.stdout.write(self.style.SUCCESS(f"Ran {processed} jobs."))
+            return
+
+        # Children must open their own database connections.
+        connections.close_all()
+        processes = [
+            context.Process(target=work, args=(stop, interval, once), name=f"job-worker-{n}")
+            for n in range(options["workers"])
+        ]
+        for process in processes:
+            process.start()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.SUCCESS(f"{len(processes)} workers stopped."))
@@ -0,0 +1,237 @@
+"""
+Per-view request metrics.
+
+RequestMetricsMiddleware times a sampled share of requests
+(METRICS_SAMPLE_RATE) and, through a database execute wrapper, counts
+their queries and the time spent in them. Per view and method it keeps a
+latency histogram plus query and DB-time totals. Sampled requests running
+more than METRICS_QUERY_BUDGET queries are logged and kept in a short list
+with their most repeated statement, which is usually the N+1 loop.
+
+The wrapper is installed on every connection but only does work for a
+request being sampled, so an unsampled request costs one random() call
+and each of its queries one context variable lookup. Latency of streamed
+responses covers producing the response, not sending its body.
+
+Counters are per process, like the cache stats. They are served at
+/api/admin/metrics/ as JSON or, with ?format=prometheus, as Prometheus
+text.
+"""
+import logging
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FLAGGED_KEEP = 50
+
+_recorder = ContextVar("metrics_recorder", default=None)
+
+
+class QueryRecorder:
+    __slots__ = ("queries", "db_time", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+
+def record_queries(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install(sender=None, connection=None, **kwargs):
+    """
+    connection_created receiver: add the execute wrapper once per connection.
+    """
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+class ViewStats:
+    __slots__ = ("requests", "buckets", "latency", "queries", "max_queries", "db_time", "over_budget")
+
+    def __init__(self):
+        self.requests = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.latency = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_time = 0.0
+        self.over_budget = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+            self.flagged = deque(maxlen=FLAGGED_KEEP)
+            self.since = timezone.now()
+
+    def record(self, view, method, duration, recorder, path):
+        budget = settings.METRICS_QUERY_BUDGET
+        over = recorder.queries > budget
+        bucket = next((i for i, bound in enumerate(BUCKETS) if duration <= bound), len(BUCKETS))
+        with self.lock:
+            stats = self.views.get((view, method))
+            if stats is None:
+                stats = self.views[(view, method)] = ViewStats()
+            stats.requests += 1
+            stats.buckets[bucket] += 1
+            stats.latency += duration
+            stats.queries += recorder.queries
+            stats.max_queries = max(stats.max_queries, recorder.queries)
+            stats.db_time += recorder.db_time
+            if over:
+                stats.over_budget += 1
+                statement, repeats = recorder.statements.most_common(1)[0]
+                self.flagged.append({
+                    "view": view,
+                    "method": method,
+                    "path": path,
+                    "queries": recorder.queries,
+                    "db_ms": round(recorder.db_time * 1000, 2),
+                    "duration_ms": round(duration * 1000, 2),
+                    "most_repeated": {"sql": statement, "count": repeats},
+                    "at": timezone.now(),
+                })
+        if over:
+            logger.warning(
+                "%s %s ran %d queries (budget %d); most repeated %d times: %s",
+                method, path, recorder.queries, budget, repeats, statement[:200],
+            )
+
+    def snapshot(self):
+        with self.lock:
+            views = []
+            for (view, method), stats in sorted(self.views.items()):
+                cumulative, buckets = 0, {}
+                for bound, count in zip([*map(str, BUCKETS), "+Inf"], stats.buckets):
+                    cumulative += count
+                    buckets[bound] = cumulative
+                views.append({
+                    "view": view,
+                    "method": method,
+                    "requests": stats.requests,
+                    "latency_buckets": buckets,
+                    "latency_seconds": round(stats.latency, 6),
+                    "mean_ms": round(stats.latency / stats.requests * 1000, 2),
+                    "queries": stats.queries,
+                    "mean_queries": round(stats.queries / stats.requests, 2),
+                    "max_queries": stats.max_queries,
+                    "db_seconds": round(stats.db_time, 6),
+                    "over_budget": stats.over_budget,
+                })
+            return {
+                "since": self.since,
+                "sample_rate": settings.METRICS_SAMPLE_RATE,
+                "query_budget": settings.METRICS_QUERY_BUDGET,
+                "views": views,
+                "over_budget": list(reversed(self.flagged)),
+            }
+
+
+registry = MetricsRegistry()
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(snapshot):
+    """
+    Prometheus text exposition (format 0.0.4) of a registry snapshot.
+    """
+    families = [
+        ("pollify_request_duration_seconds", "histogram", "Latency of sampled requests by view."),
+        ("pollify_request_queries_total", "counter", "Database queries run by sampled requests."),
+        ("pollify_request_db_seconds_total", "counter", "Time sampled requests spent in the database."),
+        ("pollify_request_over_query_budget_total", "counter", "Sampled requests over the query budget."),
+    ]
+    samples = {name: [] for name, _, _ in families}
+    for row in snapshot["views"]:
+        labels = f'view="{_label(row["view"])}",method="{_label(row["method"])}"'
+        duration = samples["pollify_request_duration_seconds"]
+        for bound, count in row["latency_buckets"].items():
+            duration.append(f'pollify_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        duration.append(f"pollify_request_duration_seconds_sum{{{labels}}} {row['latency_seconds']}")
+        duration.append(f"pollify_request_duration_seconds_count{{{labels}}} {row['requests']}")
+        samples["pollify_request_queries_total"].append(f"pollify_request_queries_total{{{labels}}} {row['queries']}")
+        samples["pollify_request_db_seconds_total"].append(
+            f"pollify_request_db_seconds_total{{{labels}}} {row['db_seconds']}"
+        )
+        samples["pollify_request_over_query_budget_total"].append(
+            f"pollify_request_over_query_budget_total{{{labels}}} {row['over_budget']}"
+        )
+
+    lines = []
+    for name, kind, help_text in families:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", *samples[name]]
+    return "\n".join(lines) + "\n"
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.route
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        recorder, start = QueryRecorder(), time.perf_counter()
+        token = _recorder.set(recorder)
+        try:
+            return self.get_response(request)
+        finally:
+            _recorder.reset(token)
+            registry.record(view_label(request), request.method, time.perf_counter() - start, recorder, request.path)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return await self.get_response(request)
+        recorder, start = QueryRecorder(), time.perf_counter()
+        token = _recorder.set(recorder)
+        try:
+            return await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+            registry.record(view_label(request), request.method, time.perf_counter() - start, recorder, request.path)
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:44
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_votes_count(apps, schema_editor):
+    Choice = apps.get_model("core", "Choice")
+    Vote = apps.get_model("core", "Vote")
+    counts = (
+        Vote.objects.filter(choice=OuterRef("pk"))
+        .values("choice")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    Choice.objects.update(votes_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='choice',
+            name='votes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='votes'),
+        ),
+        migrations.RunPython(backfill_votes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_choice_counter_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedVote',
+            fields=[
+                ('token', models.UUIDField(primary_key=True, serialize=False)),
+                ('received_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('choice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.choice')),
+                ('poll', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.poll')),
+            ],
+        ),
+    ]
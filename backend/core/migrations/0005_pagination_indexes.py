@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_queuedvote'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(fields=['-created_at'], name='poll_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(fields=['is_active', '-created_at'], name='poll_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(fields=['-end_at'], name='poll_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='votelink',
+            index=models.Index(fields=['poll', 'created_at'], name='votelink_poll_created_idx'),
+        ),
+    ]
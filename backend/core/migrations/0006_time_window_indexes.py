@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['start_at', 'end_at'], name='poll_active_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['created_at'], name='vote_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='votelink',
+            index=models.Index(condition=models.Q(('used', True)), fields=['used_at'], name='votelink_used_idx'),
+        ),
+    ]
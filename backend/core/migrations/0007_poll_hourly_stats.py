@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+
+def backfill_hourly_stats(apps, schema_editor):
+    PollHourlyStats = apps.get_model("core", "PollHourlyStats")
+    buckets = {}
+    for model, field in (("Vote", "votes"), ("VoteLink", "links_issued")):
+        rows = (
+            apps.get_model("core", model).objects
+            .annotate(bucket=TruncHour("created_at"))
+            .values("poll_id", "bucket")
+            .annotate(n=Count("pk"))
+            .order_by()
+        )
+        for row in rows.iterator():
+            key = (row["poll_id"], row["bucket"])
+            buckets.setdefault(key, PollHourlyStats(poll_id=key[0], hour=key[1]))
+            setattr(buckets[key], field, row["n"])
+    PollHourlyStats.objects.bulk_create(buckets.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_time_window_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollHourlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('links_issued', models.PositiveIntegerField(default=0)),
+                ('poll', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_stats', to='core.poll')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='pollhourlystats_hour_idx')],
+                'unique_together': {('poll', 'hour')},
+            },
+        ),
+        migrations.RunPython(backfill_hourly_stats, migrations.RunPython.noop),
+    ]
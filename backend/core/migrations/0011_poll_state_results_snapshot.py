@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+
+def backfill_state(apps, schema_editor):
+    Poll = apps.get_model("core", "Poll")
+    now = timezone.now()
+    Poll.objects.update(state=Case(
+        When(end_at__lt=now, then=Value("closed")),
+        When(is_active=False, then=Value("inactive")),
+        When(start_at__gt=now, then=Value("upcoming")),
+        default=Value("open"),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_email_delivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollResultsSnapshot',
+            fields=[
+                ('poll', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='results_snapshot', serialize=False, to='core.poll')),
+                ('end_at', models.DateTimeField()),
+                ('results', models.JSONField()),
+                ('total_votes', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='poll',
+            name='state',
+            field=models.CharField(choices=[('closed', 'closed'), ('inactive', 'inactive'), ('upcoming', 'upcoming'), ('open', 'open')], default='open', editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='poll',
+            index=models.Index(fields=['state'], name='poll_state_idx'),
+        ),
+        migrations.RunPython(backfill_state, migrations.RunPython.noop),
+    ]
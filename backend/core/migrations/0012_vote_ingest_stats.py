@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_poll_state_results_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteIngestStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flushed_total', models.PositiveBigIntegerField(default=0)),
+                ('discarded_total', models.PositiveBigIntegerField(default=0)),
+                ('last_flush_at', models.DateTimeField(blank=True, null=True)),
+                ('last_flush_size', models.PositiveIntegerField(blank=True, null=True)),
+                ('last_flush_seconds', models.FloatField(blank=True, null=True)),
+            ],
+        ),
+    ]
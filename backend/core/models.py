@@ -1,8 +1,13 @@
+import random
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import BooleanField, Case, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
+from . import clock
+
 
 class User(AbstractUser):
     """
@@ -12,6 +17,85 @@ class User(AbstractUser):
         return self.username
 
 
+def closed_q(now):
+    # The isnull check keeps the annotated form false, not NULL, without an end.
+    return Q(end_at__isnull=False, end_at__lt=now)
+
+
+def upcoming_q(now):
+    return Q(is_active=True, start_at__gt=now)
+
+
+def votable_q(now):
+    """
+    Same rule as Poll.is_votable, as a filter.
+    """
+    return (
+        Q(is_active=True)
+        & (Q(start_at__isnull=True) | Q(start_at__lte=now))
+        & (Q(end_at__isnull=True) | Q(end_at__gte=now))
+    )
+
+
+POLL_STATES = ("closed", "inactive", "upcoming", "open")
+
+
+class PollQuerySet(models.QuerySet):
+    def with_state(self, now=None):
+        """
+        Annotate `currently_votable`, `results_visible` and `current_state`
+        (one of POLL_STATES) as of `now`, computed in SQL. Poll.is_votable
+        and Poll.show_results return the annotations when present.
+        """
+        now = now or clock.now()
+        return self.annotate(
+            currently_votable=ExpressionWrapper(votable_q(now), output_field=BooleanField()),
+            results_visible=ExpressionWrapper(closed_q(now), output_field=BooleanField()),
+            current_state=Case(
+                When(closed_q(now), then=Value("closed")),
+                When(is_active=False, then=Value("inactive")),
+                When(start_at__gt=now, then=Value("upcoming")),
+                default=Value("open"),
+            ),
+        )
+
+    def in_state(self, state, now=None):
+        """
+        Filter to polls in `state` (one of POLL_STATES), with index-friendly
+        conditions rather than the current_state annotation.
+        """
+        now = now or clock.now()
+        if state == "closed":
+            return self.filter(closed_q(now))
+        not_closed = Q(end_at__isnull=True) | Q(end_at__gte=now)
+        if state == "inactive":
+            return self.filter(not_closed, is_active=False)
+        if state == "upcoming":
+            return self.filter(not_closed, upcoming_q(now))
+        return self.filter(votable_q(now))
+
+    def with_vote_total(self):
+        """
+        Annotate `vote_total` from the denormalized choice tallies (including
+        counter shards), without touching the Vote table.
+        """
+        choice_total = (
+            Choice.objects.filter(poll=OuterRef("pk"))
+            .values("poll")
+            .annotate(total=Sum("votes_count"))
+            .values("total")
+        )
+        shard_total = (
+            ChoiceCounterShard.objects.filter(choice__poll=OuterRef("pk"))
+            .values("choice__poll")
+            .annotate(total=Sum("count"))
+            .values("total")
+        )
+        return self.annotate(
+            vote_total=Coalesce(Subquery(choice_total), 0) + Coalesce(Subquery(shard_total), 0)
+        )
+
+
 class Poll(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255)
@@ -20,14 +104,62 @@ class Poll(models.Model):
     start_at = models.DateTimeField(null=True, blank=True)
     end_at = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    # Number of counter shards per choice. 1 keeps the single votes_count
+    # column; hot polls can spread increments across N shard rows.
+    counter_shards = models.PositiveSmallIntegerField(default=1)
+    # Lifecycle state as of the last save or scheduler transition
+    # (`manage.py run_scheduler`). Reads still derive state from the clock.
+    state = models.CharField(
+        max_length=10, choices=[(state, state) for state in POLL_STATES], default="open", editable=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PollQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Cursor pagination: admin list (newest first), public open polls,
+            # and closed polls (most recently ended first).
+            models.Index(fields=["-created_at"], name="poll_created_idx"),
+            models.Index(fields=["is_active", "-created_at"], name="poll_active_created_idx"),
+            models.Index(fields=["-end_at"], name="poll_end_idx"),
+            # Open/upcoming window checks only ever look at active polls.
+            models.Index(
+                fields=["start_at", "end_at"],
+                condition=models.Q(is_active=True),
+                name="poll_active_window_idx",
+            ),
+            models.Index(fields=["state"], name="poll_state_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
+    def save(self, **kwargs):
+        self.state = self.state_at()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "state"}
+        super().save(**kwargs)
+
+    def state_at(self, now=None):
+        """
+        One of POLL_STATES at `now`; the Python twin of with_state().
+        """
+        now = now or clock.now()
+        if self.end_at and self.end_at < now:
+            return "closed"
+        if not self.is_active:
+            return "inactive"
+        if self.start_at and now < self.start_at:
+            return "upcoming"
+        return "open"
+
     @property
     def is_votable(self):
-        now = timezone.now()
+        annotated = getattr(self, "currently_votable", None)
+        if annotated is not None:
+            return annotated
+        now = clock.now()
         if not self.is_active:
             return False
         if self.start_at and now < self.start_at:
@@ -38,20 +170,97 @@ class Poll(models.Model):
 
     @property
     def show_results(self):
+        annotated = getattr(self, "results_visible", None)
+        if annotated is not None:
+            return annotated
         if not self.end_at:
             return False
-        return timezone.now() > self.end_at
+        return clock.now() > self.end_at
+
+
 
+class ChoiceQuerySet(models.QuerySet):
+    def with_tally(self):
+        """
+        Annotate `tally`: votes_count plus any sharded counter rows.
+        """
+        shard_total = (
+            ChoiceCounterShard.objects.filter(choice=OuterRef("pk"))
+            .values("choice")
+            .annotate(total=Sum("count"))
+            .values("total")
+        )
+        return self.annotate(tally=F("votes_count") + Coalesce(Subquery(shard_total), 0))
 
 
 class Choice(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name="choices")
     text = models.CharField(max_length=255)
+    # Denormalized tally, bumped in the same transaction as each Vote insert.
+    # `manage.py reconcile_vote_counts` rebuilds it from Vote rows.
+    votes_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="votes")
+
+    objects = ChoiceQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.text} ({self.poll.title})"
 
+    @property
+    def total_votes(self):
+        tally = getattr(self, "tally", None)
+        if tally is not None:
+            return tally
+        # Shard rows outlive a lowered poll.counter_shards until they are
+        # folded, so they are summed whatever the current setting.
+        shards = self.counter_shards.aggregate(total=Sum("count"))["total"] or 0
+        return self.votes_count + shards
+
+    def record_vote(self, count=1):
+        """
+        Add `count` votes to the tally. Call inside the vote's transaction.
+        """
+        shards = self.poll.counter_shards
+        if shards <= 1:
+            Choice.objects.filter(pk=self.pk).update(votes_count=F("votes_count") + count)
+            return
+
+        shard = random.randrange(shards)
+        rows = ChoiceCounterShard.objects.filter(choice=self, shard=shard)
+        if rows.update(count=F("count") + count):
+            return
+        try:
+            with transaction.atomic():
+                ChoiceCounterShard.objects.create(choice=self, shard=shard, count=count)
+        except IntegrityError:
+            # Another voter created the shard row first.
+            rows.update(count=F("count") + count)
+
+
+class ChoiceCounterShard(models.Model):
+    """
+    One of N counter rows for a choice on a sharded poll.
+    The choice tally is votes_count plus the sum of its shards.
+    """
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name="counter_shards")
+    shard = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (("choice", "shard"),)
+
+    def __str__(self):
+        return f"Shard {self.shard} of {self.choice_id}: {self.count}"
+
+
+class VoteLinkQuerySet(models.QuerySet):
+    def claim(self, now=None):
+        """
+        Mark the unused links in this queryset as used in a single UPDATE.
+        Returns how many links were claimed.
+        """
+        return self.filter(used=False).update(used=True, used_at=now or timezone.now())
+
 
 class VoteLink(models.Model):
     """
@@ -66,10 +275,28 @@ class VoteLink(models.Model):
     used_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = VoteLinkQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["poll", "created_at"], name="votelink_poll_created_idx"),
+            models.Index(
+                fields=["used_at"], condition=models.Q(used=True), name="votelink_used_idx"
+            ),
+            # Duplicate-invitee checks during imports.
+            models.Index(fields=["poll", "invitee_email"], name="votelink_poll_email_idx"),
+        ]
+
     def mark_used(self):
+        """
+        Claim this link. Returns False if it had already been used.
+        """
+        now = timezone.now()
+        if not VoteLink.objects.filter(pk=self.pk).claim(now):
+            return False
         self.used = True
-        self.used_at = timezone.now()
-        self.save(update_fields=["used", "used_at"])
+        self.used_at = now
+        return True
 
     def __str__(self):
         return f"VoteLink({self.token}) -> {self.poll.title}"
@@ -83,10 +310,179 @@ class Vote(models.Model):
     poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name="votes")
     choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name="votes")
     votelink = models.OneToOneField(VoteLink, on_delete=models.CASCADE, related_name="vote")
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered votes are flushed with their received_at.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         unique_together = (("poll", "votelink"),)
+        indexes = [
+            # Votes per day (analytics), as a created_at range scan.
+            models.Index(fields=["created_at"], name="vote_created_idx"),
+        ]
 
     def __str__(self):
         return f"Vote ({self.poll.title}) -> {self.choice.text}"
+
+
+class QueuedVote(models.Model):
+    """
+    Staging row for a vote accepted in buffered ingestion mode.
+    `manage.py flush_votes` moves these into Vote in batches.
+    """
+    token = models.UUIDField(primary_key=True)
+    poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name="+")
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name="+")
+    received_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"QueuedVote({self.token})"
+
+
+class VoteIngestStats(models.Model):
+    """
+    Single row of buffered-ingestion counters. `flush_votes` runs in its own
+    process, so they are kept in the database rather than the cache for the
+    web process to read.
+    """
+    flushed_total = models.PositiveBigIntegerField(default=0)
+    discarded_total = models.PositiveBigIntegerField(default=0)
+    last_flush_at = models.DateTimeField(null=True, blank=True)
+    last_flush_size = models.PositiveIntegerField(null=True, blank=True)
+    last_flush_seconds = models.FloatField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Flushed {self.flushed_total}, discarded {self.discarded_total}"
+
+
+class PollResultsSnapshot(models.Model):
+    """
+    Final tallies of a closed poll, frozen by the scheduler when it closes.
+    Only valid for the end_at it was taken at: reopening the poll or
+    editing its choices makes it stale, and the scheduler takes a new one.
+    """
+    poll = models.OneToOneField(Poll, on_delete=models.CASCADE, primary_key=True, related_name="results_snapshot")
+    end_at = models.DateTimeField()
+    results = models.JSONField()  # [{"choice_id", "text", "votes"}]
+    total_votes = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Results of {self.poll_id} at {self.end_at}"
+
+
+class PollHourlyStats(models.Model):
+    """
+    Hourly rollup per poll, bumped on the vote and link-issuing write paths.
+    Day series are sums of 24 rows; `manage.py backfill_rollups` rebuilds it.
+    """
+    poll = models.ForeignKey(Poll, on_delete=models.CASCADE, related_name="hourly_stats")
+    hour = models.DateTimeField()
+    votes = models.PositiveIntegerField(default=0)
+    links_issued = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (("poll", "hour"),)
+        indexes = [
+            models.Index(fields=["hour"], name="pollhourlystats_hour_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.poll_id} @ {self.hour:%Y-%m-%d %H}:00"
+
+
+class Job(models.Model):
+    """
+    A long-running admin operation (e.g. an invitee import) and its progress.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    payload = models.JSONField(default=dict, blank=True)
+    poll = models.ForeignKey(Poll, on_delete=models.CASCADE, null=True, blank=True, related_name="jobs")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="jobs")
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker running the job; see jobs.claim_next.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers pick the oldest queued job.
+            models.Index(
+                fields=["created_at"], condition=models.Q(status="queued"), name="job_queued_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Job({self.kind}, {self.status})"
+
+    def set_progress(self, progress, total=None):
+        """
+        Persist progress immediately (outside any batch transaction) so
+        status polls see it while the job runs.
+        """
+        self.progress = progress
+        fields = {"progress": progress, "heartbeat_at": timezone.now()}
+        if total is not None:
+            self.total = fields["total"] = total
+        Job.objects.filter(pk=self.pk).update(**fields)
+
+    def finish(self, result=None):
+        self.status = Job.SUCCEEDED
+        self.result = result
+        self.finished_at = timezone.now()
+        self.save(update_fields=["status", "result", "progress", "total", "finished_at"])
+
+    def fail(self, error, result=None):
+        self.status = Job.FAILED
+        self.error = str(error)
+        self.result = result
+        self.finished_at = timezone.now()
+        self.save(update_fields=["status", "error", "result", "progress", "total", "finished_at"])
+
+
+class EmailDelivery(models.Model):
+    """
+    One recipient of a bulk invitation send, with its delivery outcome.
+    """
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    ]
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="deliveries")
+    email = models.EmailField()
+    name = models.CharField(max_length=255, blank=True)
+    link = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["job", "status"], name="delivery_job_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.email} ({self.status})"
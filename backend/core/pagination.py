@@ -0,0 +1,31 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination, newest first. Page size comes from the
+    API_PAGE_SIZE setting and can be overridden with ?page_size=.
+    """
+    ordering = "-created_at"
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class EndAtCursorPagination(CreatedAtCursorPagination):
+    """
+    Closed polls, most recently ended first.
+    """
+    ordering = "-end_at"
+
+
+class VoteLinkPagination(CursorPagination):
+    ordering = "created_at"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class DeliveryPagination(VoteLinkPagination):
+    ordering = "id"
@@ -0,0 +1,82 @@
+"""
+Hand-built public poll payloads.
+
+Produces the same JSON as PollPublicSerializer from `.values()` rows and
+plain dicts: one query for all the choices (with tallies) of a batch of
+polls, and poll state taken from the with_state() annotations (or the
+request's clock when they are absent) instead of per field. The
+public read endpoints use this; the serializer remains the reference
+(see PublicPayloadTests) and what the API schema describes.
+"""
+from collections import defaultdict
+
+from django.utils import timezone
+
+from . import clock
+from .models import Choice
+
+POLL_FIELDS = ("id", "title", "description", "start_at", "end_at", "is_active", "created_at")
+
+
+def format_datetime(value, tz):
+    """
+    DRF's ISO 8601 DateTimeField output.
+    """
+    if not value:
+        return None
+    text = value.astimezone(tz).isoformat()
+    if text.endswith("+00:00"):
+        text = text[:-6] + "Z"
+    return text
+
+
+def public_poll_payloads(rows, now=None):
+    """
+    PollPublicSerializer output for poll rows from `.values(*POLL_FIELDS)`,
+    in the same order. Rows that also carry the with_state() annotations
+    (`currently_votable`, `results_visible`) use them as is.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    now = now or clock.now()
+    tz = timezone.get_current_timezone()
+
+    choices = defaultdict(list)
+    choice_rows = (
+        Choice.objects.filter(poll_id__in=[row["id"] for row in rows])
+        .with_tally()
+        .values_list("poll_id", "id", "text", "tally")
+    )
+    for poll_id, choice_id, text, tally in choice_rows:
+        choices[poll_id].append((choice_id, text, tally))
+
+    payloads = []
+    for row in rows:
+        start_at, end_at = row["start_at"], row["end_at"]
+        show_results = row.get("results_visible")
+        if show_results is None:
+            show_results = bool(end_at) and now > end_at
+        is_votable = row.get("currently_votable")
+        if is_votable is None:
+            is_votable = (
+                row["is_active"]
+                and not (start_at and now < start_at)
+                and not (end_at and now > end_at)
+            )
+        payloads.append({
+            "id": str(row["id"]),
+            "title": row["title"],
+            "description": row["description"],
+            "start_at": format_datetime(start_at, tz),
+            "end_at": format_datetime(end_at, tz),
+            "is_active": row["is_active"],
+            "choices": [
+                {"id": str(choice_id), "text": text, "votes_count": tally if show_results else None}
+                for choice_id, text, tally in choices[row["id"]]
+            ],
+            "is_votable": bool(is_votable),
+            "show_results": show_results,
+            "created_at": format_datetime(row["created_at"], tz),
+        })
+    return payloads
@@ -0,0 +1,64 @@
+"""
+orjson-backed JSON renderer for the API.
+
+Renders what DRF's JSONRenderer does with its default settings (compact,
+UTF-8, U+2028/U+2029 escaped; floats may use a shorter exponent form), but
+several times faster on large payloads. UUIDs, datetimes and dates are
+encoded by orjson itself; other types go through DRF's encoder.
+Pretty-printed output (`; indent=` or the browsable API), non-default
+UNICODE_JSON/COMPACT_JSON settings and anything orjson refuses (such as
+integers above 64 bits) use the stdlib renderer, as does everything when
+orjson is not installed.
+"""
+from rest_framework.utils import encoders
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .metrics import prometheus_text
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINE_SEPARATOR = "\u2028".encode()
+PARAGRAPH_SEPARATOR = "\u2029".encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def __init__(self):
+        self.fallback = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.fallback, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if LINE_SEPARATOR in ret or PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(LINE_SEPARATOR, b"\\u2028").replace(PARAGRAPH_SEPARATOR, b"\\u2029")
+        return ret
+
+
+class PrometheusRenderer(BaseRenderer):
+    """
+    Prometheus text format for a core.metrics registry snapshot
+    (?format=prometheus or Accept: text/plain).
+    """
+    media_type = "text/plain"
+    format = "prometheus"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict) and "views" in data:
+            return prometheus_text(data).encode()
+        # Errors (e.g. 403) have no metrics to expose.
+        return f"# {data}\n".encode()
@@ -0,0 +1,160 @@
+"""
+Versioned cache for per-poll payloads (results, stats, public detail).
+
+Keys are `poll:<id>:<kind>:<version>`. The version is bumped whenever a vote
+lands or the poll or its choices change, so stale entries are never read;
+they simply age out. Payloads for closed polls rarely change and are kept
+for CLOSED_RESULTS_CACHE_TIMEOUT. That bound matters because a version bump
+made in another process (flush_votes, run_workers, run_scheduler) only
+reaches this one through a shared cache backend.
+
+Versions are nanosecond timestamps of the last change, so they double as
+Last-Modified values for conditional requests. A separate catalog version
+tracks edits to any poll (for list endpoints); votes do not touch it.
+
+Uses Django's default cache (local memory unless CACHES says otherwise).
+The `a`-prefixed functions are the same operations for async views.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from . import clock
+
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+CATALOG_VERSION_KEY = "polls:catalog-version"
+
+
+def _version_key(poll_id):
+    return f"poll:{poll_id}:version"
+
+
+def _read_version(key):
+    """
+    Missing versions (first use or cache eviction) are seeded from the
+    clock, so they never repeat an old value.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def poll_version(poll_id):
+    return _read_version(_version_key(poll_id))
+
+
+def _local_cache():
+    """
+    Django's async cache API runs every call on a worker thread. The
+    local-memory cache never blocks, so async callers use it directly.
+    """
+    return isinstance(caches["default"], LocMemCache)
+
+
+async def apoll_version(poll_id):
+    if _local_cache():
+        return poll_version(poll_id)
+    key = _version_key(poll_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def catalog_version():
+    return _read_version(CATALOG_VERSION_KEY)
+
+
+def bump_poll_version(poll_id):
+    cache.set(_version_key(poll_id), time.time_ns(), None)
+
+
+def bump_catalog_version():
+    cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def bump_on_commit(poll_id):
+    transaction.on_commit(lambda: bump_poll_version(poll_id))
+
+
+def timeout_for(poll, now=None):
+    """
+    Closed polls: CLOSED_RESULTS_CACHE_TIMEOUT. Otherwise expire at the next
+    state change (opening or closing), capped at RESULTS_CACHE_TIMEOUT.
+    """
+    now = now or clock.now()
+    if poll.end_at and poll.end_at < now:
+        return settings.CLOSED_RESULTS_CACHE_TIMEOUT
+    timeout = settings.RESULTS_CACHE_TIMEOUT
+    for moment in (poll.start_at, poll.end_at):
+        if moment and moment > now:
+            timeout = min(timeout, (moment - now).total_seconds())
+    return max(1, int(timeout))
+
+
+def get_or_build(kind, poll_id, build):
+    """
+    Return the cached `kind` payload for a poll, or call `build()` which must
+    return `(payload, poll)` and cache the result.
+    """
+    key = _payload_key(kind, poll_id, poll_version(poll_id))
+    payload = cache.get(key)
+    if payload is not None:
+        _count("hits")
+        return payload
+
+    _count("misses")
+    payload, poll = build()
+    if payload is not None:
+        cache.set(key, payload, timeout_for(poll))
+    return payload
+
+
+async def aget_or_build(kind, poll_id, build):
+    """
+    get_or_build for async views. `build` is still a sync callable (it
+    usually serializes ORM objects) and runs in a worker thread on a miss.
+    """
+    key = _payload_key(kind, poll_id, await apoll_version(poll_id))
+    payload = cache.get(key) if _local_cache() else await cache.aget(key)
+    if payload is not None:
+        _count("hits")
+        return payload
+
+    _count("misses")
+    payload, poll = await sync_to_async(build)()
+    if payload is not None:
+        await cache.aset(key, payload, timeout_for(poll))
+    return payload
+
+
+def _payload_key(kind, poll_id, version):
+    return f"poll:{poll_id}:{kind}:{version}"
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def cache_stats():
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0,
+    }
@@ -0,0 +1,106 @@
+"""
+Incrementally maintained analytics rollups (PollHourlyStats).
+
+The vote and link-issuing write paths call record_votes / record_links_issued
+inside their transactions. Dashboards read these rows instead of scanning
+Vote or VoteLink.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import PollHourlyStats, Vote, VoteLink
+
+INTERVALS = {"hour": TruncHour, "day": TruncDay}
+
+
+def hour_of(moment=None):
+    moment = moment or timezone.now()
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _bump(poll_id, hour, **deltas):
+    rows = PollHourlyStats.objects.filter(poll_id=poll_id, hour=hour)
+    increments = {field: F(field) + n for field, n in deltas.items()}
+    if rows.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            PollHourlyStats.objects.create(poll_id=poll_id, hour=hour, **deltas)
+    except IntegrityError:
+        # Another writer created this hour's row first.
+        rows.update(**increments)
+
+
+def record_votes(poll_id, count=1, at=None):
+    _bump(poll_id, hour_of(at), votes=count)
+
+
+def record_links_issued(poll_id, count=1, at=None):
+    if count:
+        _bump(poll_id, hour_of(at), links_issued=count)
+
+
+def record_vote_batch(queued_votes):
+    """
+    Roll up a batch of QueuedVote rows by (poll, hour received).
+    """
+    buckets = Counter((queued.poll_id, hour_of(queued.received_at)) for queued in queued_votes)
+    for (poll_id, hour), count in buckets.items():
+        _bump(poll_id, hour, votes=count)
+
+
+def series(interval="day", days=7, poll=None, now=None):
+    """
+    Votes and links issued per hour/day over the last `days` days.
+    """
+    now = now or timezone.now()
+    rows = PollHourlyStats.objects.filter(hour__gte=hour_of(now) - timedelta(days=days))
+    if poll is not None:
+        rows = rows.filter(poll=poll)
+    rows = (
+        rows.annotate(bucket=INTERVALS[interval]("hour"))
+        .values("bucket")
+        .annotate(votes=Sum("votes"), links_issued=Sum("links_issued"))
+        .order_by("bucket")
+    )
+    return [
+        {"bucket": row["bucket"].isoformat(), "votes": row["votes"], "links_issued": row["links_issued"]}
+        for row in rows
+    ]
+
+
+def backfill(poll=None):
+    """
+    Rebuild PollHourlyStats from Vote and VoteLink rows.
+    Returns the number of hourly rows written.
+    """
+    votes = Vote.objects.all()
+    links = VoteLink.objects.all()
+    existing = PollHourlyStats.objects.all()
+    if poll is not None:
+        votes, links, existing = (
+            votes.filter(poll=poll), links.filter(poll=poll), existing.filter(poll=poll)
+        )
+
+    buckets = {}
+    for qs, field in ((votes, "votes"), (links, "links_issued")):
+        grouped = (
+            qs.annotate(bucket=TruncHour("created_at"))
+            .values("poll_id", "bucket")
+            .annotate(n=Count("pk"))
+            .order_by()
+        )
+        for row in grouped.iterator():
+            key = (row["poll_id"], row["bucket"])
+            buckets.setdefault(key, PollHourlyStats(poll_id=key[0], hour=key[1]))
+            setattr(buckets[key], field, row["n"])
+
+    with transaction.atomic():
+        existing.delete()
+        PollHourlyStats.objects.bulk_create(buckets.values(), batch_size=1000)
+    return len(buckets)
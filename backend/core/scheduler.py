@@ -0,0 +1,126 @@
+"""
+Poll lifecycle scheduler (`manage.py run_scheduler`).
+
+Keeps Poll.state in step with start_at/end_at. Upcoming transitions within
+the horizon sit in a min-heap keyed by the moment they happen, so the loop
+sleeps until the next one instead of polling. A periodic rescan picks up
+polls created or edited since (and anything missed while the scheduler was
+down) by comparing the stored state with with_state().
+
+When a poll closes, its final tallies are frozen into a PollResultsSnapshot
+and its results and public detail payloads are built into the results
+cache. The first wave of results requests is then served from the cache,
+or from the snapshot when the cache is cold. Pre-warming only reaches
+other processes through a shared cache backend (see CACHES). A poll that
+still has buffered votes waiting for `flush_votes` is frozen on a later
+rescan, once they have landed.
+"""
+import heapq
+import logging
+from datetime import timedelta
+
+from django.db.models import F, Q
+
+from .models import Choice, Poll, PollResultsSnapshot, QueuedVote
+from .results_cache import get_or_build
+from .views import build_public_payload, build_results_payload
+
+logger = logging.getLogger(__name__)
+
+
+def freeze_results(poll):
+    """
+    Snapshot the final tallies of a closed poll. Returns the snapshot, or
+    None while votes for the poll are still queued.
+    """
+    if QueuedVote.objects.filter(poll=poll).exists():
+        return None
+    results = [
+        {"choice_id": str(choice_id), "text": text, "votes": tally}
+        for choice_id, text, tally in Choice.objects.filter(poll=poll).with_tally().values_list("id", "text", "tally")
+    ]
+    snapshot, _ = PollResultsSnapshot.objects.update_or_create(
+        poll=poll,
+        defaults={"end_at": poll.end_at, "results": results, "total_votes": sum(r["votes"] for r in results)},
+    )
+    return snapshot
+
+
+def warm_caches(poll):
+    get_or_build("results", poll.pk, lambda: build_results_payload(poll))
+    get_or_build("public-detail", poll.pk, lambda: build_public_payload(poll.pk))
+
+
+class LifecycleScheduler:
+    def __init__(self, horizon=timedelta(minutes=5)):
+        self.horizon = horizon
+        self.heap = []  # (moment, poll_id)
+        self.queued = set()
+
+    def rescan(self, now):
+        """
+        Apply every pending state change, drop stale snapshots, freeze the
+        missing ones and queue the transitions due within the horizon.
+        Returns the number of polls whose state changed.
+        """
+        changed = self.apply(Poll.objects.all(), now)
+
+        PollResultsSnapshot.objects.exclude(poll__state="closed", end_at=F("poll__end_at")).delete()
+        for poll in Poll.objects.filter(state="closed", results_snapshot__isnull=True):
+            self.close(poll)
+
+        until = now + self.horizon
+        window = Q(start_at__gt=now, start_at__lte=until) | Q(end_at__gte=now, end_at__lte=until)
+        for poll_id, start_at, end_at in Poll.objects.filter(window).values_list("pk", "start_at", "end_at"):
+            for moment in (start_at, end_at):
+                if moment and now <= moment <= until:
+                    self.push(moment, poll_id)
+        return changed
+
+    def push(self, moment, poll_id):
+        if (moment, poll_id) not in self.queued:
+            self.queued.add((moment, poll_id))
+            heapq.heappush(self.heap, (moment, poll_id))
+
+    def run_due(self, now):
+        """
+        Apply the transitions that have happened by `now`. A poll closes
+        once now is past end_at (see Poll.state_at), so a transition is
+        only due strictly after its moment.
+        """
+        due = set()
+        while self.heap and self.heap[0][0] < now:
+            entry = heapq.heappop(self.heap)
+            self.queued.discard(entry)
+            due.add(entry[1])
+        if not due:
+            return 0
+        return self.apply(Poll.objects.filter(pk__in=due), now)
+
+    def apply(self, polls, now):
+        """
+        Persist the current state of any of `polls` whose stored state is
+        out of date (the poll may have been edited since it was queued),
+        closing the ones that have just closed.
+        """
+        stale = polls.with_state(now).exclude(state=F("current_state")).values_list("pk", "current_state")
+        by_state = {}
+        for poll_id, state in stale:
+            by_state.setdefault(state, []).append(poll_id)
+        for state, poll_ids in by_state.items():
+            # A queryset update skips post_save, so cached payloads keep
+            # their version: nothing in them depends on the stored state.
+            Poll.objects.filter(pk__in=poll_ids).update(state=state)
+            logger.info("%d polls are now %s", len(poll_ids), state)
+        for poll in Poll.objects.filter(pk__in=by_state.get("closed", [])):
+            self.close(poll)
+        return sum(len(poll_ids) for poll_ids in by_state.values())
+
+    def close(self, poll):
+        if freeze_results(poll) is None:
+            logger.info("Poll %s has queued votes; freezing its results later", poll.pk)
+            return
+        warm_caches(poll)
+
+    def next_due(self):
+        return self.heap[0][0] if self.heap else None
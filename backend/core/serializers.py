@@ -1,9 +1,16 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef
 from rest_framework import serializers
-from .models import Poll, Choice, VoteLink, Vote, User
+from . import tokens
+from .models import Poll, Choice, PollResultsSnapshot, VoteLink, Vote, QueuedVote, Job, EmailDelivery, User
+from .results_cache import bump_catalog_version, bump_on_commit
+from .rollups import record_votes
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 
 class ChoiceSerializer(serializers.ModelSerializer):
+    # Writable so admin edits can name the choice they change; new choices omit it.
+    id = serializers.UUIDField(required=False)
     votes_count = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
@@ -14,7 +21,7 @@ class ChoiceSerializer(serializers.ModelSerializer):
         poll = obj.poll
         # Only show votes to voters if poll.show_results=True
         if getattr(poll, "show_results", False):
-            return obj.votes.count()
+            return obj.total_votes
         return None
 
 
@@ -41,6 +48,7 @@ class PollAdminSerializer(serializers.ModelSerializer):
             "start_at",
             "end_at",
             "is_active",
+            "counter_shards",
             "choices",
             "vote_links",
             "is_votable",
@@ -51,29 +59,93 @@ class PollAdminSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         choices_data = validated_data.pop("choices", [])
-        poll = Poll.objects.create(**validated_data)
-
-        for choice in choices_data:
-            Choice.objects.create(poll=poll, text=choice["text"])
-
+        with transaction.atomic():
+            poll = Poll.objects.create(**validated_data)
+            Choice.objects.bulk_create(Choice(poll=poll, text=choice["text"]) for choice in choices_data)
+            self.choices_changed(poll)
         return poll
 
     def update(self, instance, validated_data):
         choices_data = validated_data.pop("choices", None)
 
-        # update poll fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        with transaction.atomic():
+            # update poll fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
 
-        # replace choices (not append)
-        if choices_data is not None:
-            instance.choices.all().delete()
-            for choice in choices_data:
-                Choice.objects.create(poll=instance, text=choice["text"])
+            if choices_data is not None:
+                self.sync_choices(instance, choices_data)
 
         return instance
 
+    def sync_choices(self, poll, choices_data):
+        """
+        Make the poll's choices match `choices_data` in a fixed number of
+        queries: entries with an id update that choice's text, entries
+        without one are new, and choices left out are deleted. Removing a
+        choice that already has votes is refused rather than cascading.
+        """
+        has_votes = Exists(Vote.objects.filter(choice=OuterRef("pk"))) | Exists(
+            QueuedVote.objects.filter(choice=OuterRef("pk"))
+        )
+        existing = {
+            choice.id: choice
+            for choice in Choice.objects.filter(poll=poll).only("id", "poll", "text").annotate(has_votes=has_votes)
+        }
+
+        kept, changed, added = set(), [], []
+        for item in choices_data:
+            choice_id = item.get("id")
+            if choice_id is None:
+                added.append(Choice(poll=poll, text=item["text"]))
+                continue
+            choice = existing.get(choice_id)
+            if choice is None or choice_id in kept:
+                raise serializers.ValidationError(
+                    {"choices": f"Choice {choice_id} is not a choice of this poll or is listed twice."}
+                )
+            kept.add(choice_id)
+            if choice.text != item["text"]:
+                choice.text = item["text"]
+                changed.append(choice)
+
+        removed = [choice for choice_id, choice in existing.items() if choice_id not in kept]
+        voted = [choice.text for choice in removed if choice.has_votes]
+        if voted:
+            raise serializers.ValidationError(
+                {"choices": f"Choices with votes cannot be removed: {', '.join(voted)}."}
+            )
+
+        if changed:
+            Choice.objects.bulk_update(changed, ["text"])
+        if added:
+            Choice.objects.bulk_create(added)
+        if removed:
+            Choice.objects.filter(pk__in=[choice.pk for choice in removed]).delete()
+        if changed or added or removed:
+            # A frozen results snapshot would now show the old choices.
+            PollResultsSnapshot.objects.filter(poll=poll).delete()
+            self.choices_changed(poll)
+
+    @staticmethod
+    def choices_changed(poll):
+        # bulk_create/bulk_update skip the post_save signals that bump cache versions.
+        bump_on_commit(poll.pk)
+        transaction.on_commit(bump_catalog_version)
+
+
+# Admin poll list: counts instead of the full invite list.
+# Expects the vote_links_count / used_links_count annotations from PollViewSet.
+class PollAdminListSerializer(PollAdminSerializer):
+    vote_links_count = serializers.IntegerField(read_only=True)
+    used_links_count = serializers.IntegerField(read_only=True)
+
+    class Meta(PollAdminSerializer.Meta):
+        fields = [
+            field for field in PollAdminSerializer.Meta.fields if field != "vote_links"
+        ] + ["vote_links_count", "used_links_count"]
+
 
 # Public-facing poll serializer (hide vote links)
 class PollPublicSerializer(serializers.ModelSerializer):
@@ -107,46 +179,145 @@ class VoteSerializer(serializers.ModelSerializer):
         # We do not accept poll from client — it's derived from votelink
         fields = ["votelink", "choice"]
 
-    def validate(self, attrs):
-        token = attrs.get("votelink")
-        choice_id = attrs.get("choice")
-
-        # Validate vote link
-        try:
-            votelink = VoteLink.objects.get(token=token)
-        except VoteLink.DoesNotExist:
+    @staticmethod
+    def target_queryset(token, choice_id):
+        """
+        One query: choice + poll, joined through the vote link so it also
+        proves the choice belongs to the link's poll.
+        """
+        return (
+            Choice.objects.select_related("poll")
+            .filter(id=choice_id, poll__vote_links__token=token)
+            .annotate(link_used=F("poll__vote_links__used"))
+        )
+
+    @staticmethod
+    def resolve_target(token, choice_id):
+        """
+        (link, choice) for a vote. A cached link only needs the choice
+        looked up; a cold one is read together with the choice.
+        """
+        token, link = tokens.resolver.lookup(token)
+        if link is None:
+            return None, None
+        if link is not tokens.MISS:
+            choice = None if link.used else Choice.objects.filter(id=choice_id, poll_id=link.poll.pk).first()
+            return link, choice
+        choice = VoteSerializer.target_queryset(token, choice_id).first()
+        if choice is None:
+            return tokens.resolver.fetch(token), None
+        return tokens.resolver.remember(token, choice.poll, choice.link_used), choice
+
+    @staticmethod
+    async def aresolve_target(token, choice_id):
+        token, link = await tokens.resolver.alookup(token)
+        if link is None:
+            return None, None
+        if link is not tokens.MISS:
+            choice = None
+            if not link.used:
+                choice = await Choice.objects.filter(id=choice_id, poll_id=link.poll.pk).afirst()
+            return link, choice
+        choice = await VoteSerializer.target_queryset(token, choice_id).afirst()
+        if choice is None:
+            return await tokens.resolver.afetch(token), None
+        return await tokens.resolver.aremember(token, choice.poll, choice.link_used), choice
+
+    @staticmethod
+    def check_target(link, choice):
+        """
+        Raise the validation error for a resolved link and its choice, or
+        return (choice, poll).
+        """
+        if link is None:
             raise serializers.ValidationError({"votelink": "Invalid vote token."})
-
-        if votelink.used:
+        if link.used:
             raise serializers.ValidationError({"votelink": "This vote link has already been used."})
-
-        poll = votelink.poll
+        if choice is None:
+            raise serializers.ValidationError({"choice": "Invalid choice for this poll."})
 
         # Validate poll is votable
-        if not poll.is_votable:
+        if not link.poll.is_votable:
             raise serializers.ValidationError({"poll": "Voting for this poll is closed."})
+        choice.poll = link.poll
+        return choice, link.poll
 
-        # Validate choice belongs to poll
-        try:
-            choice = Choice.objects.get(id=choice_id, poll=poll)
-        except Choice.DoesNotExist:
-            raise serializers.ValidationError({"choice": "Invalid choice for this poll."})
-
-        # Prevent double voting by same votelink is already enforced (votelink.used)
-        attrs["votelink_obj"] = votelink
-        attrs["choice_obj"] = choice
-        attrs["poll_obj"] = poll
+    def validate(self, attrs):
+        link, choice = self.resolve_target(attrs.get("votelink"), attrs.get("choice"))
+        attrs["choice_obj"], attrs["poll_obj"] = self.check_target(link, choice)
         return attrs
 
     def create(self, validated_data):
-        votelink = validated_data["votelink_obj"]
+        token = validated_data["votelink"]
         choice = validated_data["choice_obj"]
         poll = validated_data["poll_obj"]
 
-        vote = Vote.objects.create(poll=poll, choice=choice, votelink=votelink)
-        votelink.mark_used()
+        with transaction.atomic():
+            # Conditional UPDATE claims the link; a concurrent request that
+            # already claimed it leaves rowcount at 0.
+            if not VoteLink.objects.filter(token=token).claim():
+                raise serializers.ValidationError({"votelink": "This vote link has already been used."})
+            vote = Vote.objects.create(poll=poll, choice=choice, votelink_id=token)
+            choice.record_vote()
+            record_votes(poll.id)
+            bump_on_commit(poll.id)
+            transaction.on_commit(lambda: tokens.forget(token))
         return vote
 
+    def enqueue(self):
+        """
+        Buffered ingestion: stage the validated vote for `flush_votes`
+        instead of writing it now. The token is the staging row's key, so a
+        token can only be queued once.
+        """
+        data = self.validated_data
+        try:
+            with transaction.atomic():
+                queued = QueuedVote.objects.create(
+                    token=data["votelink"], poll=data["poll_obj"], choice=data["choice_obj"]
+                )
+        except IntegrityError:
+            raise serializers.ValidationError({"votelink": "This vote link has already been used."})
+        tokens.forget(queued.token)
+        return queued
+
+    @staticmethod
+    async def aenqueue(data):
+        """
+        enqueue() for async views; the single INSERT needs no transaction.
+        """
+        try:
+            queued = await QueuedVote.objects.acreate(
+                token=data["votelink"], poll=data["poll_obj"], choice=data["choice_obj"]
+            )
+        except IntegrityError:
+            raise serializers.ValidationError({"votelink": "This vote link has already been used."})
+        tokens.forget(queued.token)
+        return queued
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            "id", "kind", "status", "poll", "progress", "total", "result", "error",
+            "created_at", "started_at", "finished_at",
+        ]
+        read_only_fields = fields
+
+
+class EmailDeliverySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EmailDelivery
+        fields = ["id", "email", "name", "status", "attempts", "error", "sent_at"]
+        read_only_fields = fields
+
+
+class ReconcileVotesSerializer(serializers.Serializer):
+    poll = serializers.UUIDField(required=False)
+    dry_run = serializers.BooleanField(default=False)
+    fold_shards = serializers.BooleanField(default=False)
+
 
 class PollResultsSerializer(serializers.Serializer):
     poll_id = serializers.UUIDField()
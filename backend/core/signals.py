@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Choice, Poll
+from .results_cache import bump_catalog_version, bump_poll_version
+
+
+def bump_versions_on_commit(poll_id):
+    """
+    Bump once the change is committed, like the vote path: bumping earlier
+    lets a concurrent reader cache pre-commit data under the new version.
+    """
+    def bump():
+        bump_poll_version(poll_id)
+        bump_catalog_version()
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Poll)
+@receiver(post_delete, sender=Poll)
+def poll_changed(sender, instance, **kwargs):
+    bump_versions_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def choice_changed(sender, instance, **kwargs):
+    bump_versions_on_commit(instance.poll_id)
@@ -0,0 +1,121 @@
+"""
+Job handlers for the background queue (see core/jobs.py). Imported from
+CoreConfig.ready so every process registers the same kinds.
+"""
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .imports import import_invitees
+from .jobs import handler, save_output
+from .links import csv_lines, issue_vote_links, link_rows, ndjson_lines
+from .mailer import BulkMailer
+from .models import EmailDelivery, Job
+
+
+@handler("import_invitees")
+def run_import_invitees(job):
+    path = job.payload["path"]
+    try:
+        with default_storage.open(path, "rb") as fileobj:
+            return import_invitees(job, job.poll, fileobj, job.payload["format"])
+    finally:
+        default_storage.delete(path)
+
+
+@handler("bulk_generate_links")
+def run_bulk_generate_links(job):
+    """
+    Issue the links and store them as the job's output. The issued tokens
+    are saved to the payload in the same transaction as the links, so a
+    re-run (a reclaimed or retried job) only rewrites the output file
+    instead of giving every invitee a second valid link.
+    """
+    invitees = job.payload["invitees"]
+    output = job.payload.get("output", "ndjson")
+    job.set_progress(0, total=len(invitees))
+    tokens = job.payload.get("issued_tokens")
+    if tokens is None:
+        with transaction.atomic():
+            tokens = [str(token) for token in issue_vote_links(job.poll, invitees)]
+            job.payload["issued_tokens"] = tokens
+            Job.objects.filter(pk=job.pk).update(payload=job.payload)
+    job.set_progress(len(tokens))
+
+    rows = link_rows(job.payload["base_url"], invitees, tokens)
+    lines = csv_lines(rows) if output == "csv" else ndjson_lines(rows)
+    return {"created": len(tokens), "output": save_output(job, lines, output)}
+
+
+def pending_delivery_batches(job, batch_size):
+    """
+    Keyset-paginate the job's pending deliveries, one query per batch.
+    """
+    last_id = 0
+    while True:
+        batch = list(
+            job.deliveries.filter(status=EmailDelivery.PENDING, id__gt=last_id)
+            .order_by("id")
+            .values("id", "email", "name", "link", "attempts")[:batch_size]
+        )
+        if not batch:
+            return
+        last_id = batch[-1]["id"]
+        for row in batch:
+            row["key"] = row["id"]
+        yield batch
+
+
+@handler("send_vote_links")
+def run_send_vote_links(job):
+    """
+    Send every pending EmailDelivery of the job and record each outcome.
+    Retrying a job only resends what is pending again.
+    """
+    total = job.deliveries.filter(status=EmailDelivery.PENDING).count()
+    job.set_progress(0, total=total)
+    previous_attempts = {}
+    done = 0
+
+    def batches():
+        for batch in pending_delivery_batches(job, settings.BULK_EMAIL_BATCH_SIZE):
+            previous_attempts.update((row["id"], row["attempts"]) for row in batch)
+            yield batch
+
+    mailer = BulkMailer()
+    for results in mailer.send(batches(), job.payload.get("poll_title", "Poll")):
+        now = timezone.now()
+        updates = [
+            EmailDelivery(
+                id=outcome["key"],
+                status=EmailDelivery.FAILED if outcome["error"] else EmailDelivery.SENT,
+                error=outcome["error"] or "",
+                attempts=previous_attempts.pop(outcome["key"]) + outcome["attempts"],
+                sent_at=None if outcome["error"] else now,
+            )
+            for outcome in results
+        ]
+        EmailDelivery.objects.bulk_update(updates, ["status", "error", "attempts", "sent_at"])
+        done += len(results)
+        job.set_progress(done)
+
+    counts = dict(job.deliveries.values_list("status").annotate(n=Count("id")).order_by())
+    return {status: counts.get(status, 0) for status, _ in EmailDelivery.STATUS_CHOICES}
+
+
+@handler("reconcile_vote_counts")
+def run_reconcile_vote_counts(job):
+    options = {
+        "dry_run": job.payload.get("dry_run", False),
+        "fold_shards": job.payload.get("fold_shards", False),
+    }
+    if job.payload.get("poll"):
+        options["poll"] = job.payload["poll"]
+    log = StringIO()
+    call_command("reconcile_vote_counts", stdout=log, **options)
+    return {"log": log.getvalue()}
@@ -1,3 +1,1396 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import smtplib
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .payloads import POLL_FIELDS, public_poll_payloads
+from .renderers import FastJSONRenderer
+from .serializers import PollAdminSerializer, PollPublicSerializer, VoteSerializer
+from .ingest import flush_queued_votes
+from .scheduler import LifecycleScheduler
+from .results_cache import cache_stats, poll_version, timeout_for
+from .rollups import hour_of
+from .bloom import BloomFilter
+from . import async_views, clock, exports, live, metrics, tokens
+from .mailer import BulkMailer
+from . import jobs
+from .models import POLL_STATES, User, Poll, Choice, ChoiceCounterShard, PollHourlyStats, PollResultsSnapshot, QueuedVote, VoteLink, Vote, Job, EmailDelivery
+
+
+def make_poll(title="Favorite Language", choices=("Python", "JavaScript"), **kwargs):
+    now = timezone.now()
+    kwargs.setdefault("start_at", now - timedelta(days=1))
+    kwargs.setdefault("end_at", now + timedelta(days=1))
+    poll = Poll.objects.create(title=title, **kwargs)
+    for text in choices:
+        Choice.objects.create(poll=poll, text=text)
+    return poll
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class VoteCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.poll = make_poll()
+        self.python = self.poll.choices.get(text="Python")
+        self.js = self.poll.choices.get(text="JavaScript")
+
+    def vote(self, choice):
+        link = VoteLink.objects.create(poll=self.poll)
+        return self.client.post(
+            "/api/vote/", {"token": str(link.token), "choice_id": str(choice.id)}, format="json"
+        )
+
+    def test_vote_increments_choice_counter(self):
+        self.assertEqual(self.vote(self.python).status_code, 201)
+        self.assertEqual(self.vote(self.python).status_code, 201)
+        self.assertEqual(self.vote(self.js).status_code, 201)
+
+        self.python.refresh_from_db()
+        self.js.refresh_from_db()
+        self.assertEqual(self.python.votes_count, 2)
+        self.assertEqual(self.js.votes_count, 1)
+
+    def test_results_read_counter_without_counting_votes(self):
+        self.vote(self.python)
+        link = VoteLink.objects.create(poll=self.poll)
+        Poll.objects.filter(pk=self.poll.pk).update(end_at=timezone.now() - timedelta(minutes=1))
+
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/poll-results/", {"token": str(link.token)})
+
+        self.assertEqual(response.status_code, 200)
+        votes = {r["text"]: r["votes"] for r in response.data["results"]}
+        self.assertEqual(votes, {"Python": 1, "JavaScript": 0})
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        self.vote(self.python)
+        Choice.objects.filter(pk=self.python.pk).update(votes_count=7)
+        Choice.objects.filter(pk=self.js.pk).update(votes_count=3)
+
+        out = StringIO()
+        call_command("reconcile_vote_counts", "--dry-run", stdout=out)
+        self.assertIn("found drift on 2", out.getvalue())
+        self.python.refresh_from_db()
+        self.assertEqual(self.python.votes_count, 7)
+
+        version = poll_version(self.poll.pk)
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("reconcile_vote_counts", stdout=out)
+        self.assertIn("fixed drift on 2", out.getvalue())
+        self.assertNotEqual(poll_version(self.poll.pk), version)
+        self.python.refresh_from_db()
+        self.js.refresh_from_db()
+        self.assertEqual(self.python.votes_count, Vote.objects.filter(choice=self.python).count())
+        self.assertEqual(self.js.votes_count, 0)
+
+    def test_sharded_poll_spreads_votes_and_sums_on_read(self):
+        Poll.objects.filter(pk=self.poll.pk).update(counter_shards=4)
+        for _ in range(20):
+            self.assertEqual(self.vote(self.python).status_code, 201)
+
+        self.python.refresh_from_db()
+        self.assertEqual(self.python.votes_count, 0)
+        shards = ChoiceCounterShard.objects.filter(choice=self.python)
+        self.assertLessEqual(shards.count(), 4)
+        self.assertEqual(Choice.objects.with_tally().get(pk=self.python.pk).tally, 20)
+
+        Poll.objects.filter(pk=self.poll.pk).update(counter_shards=1)
+        self.assertEqual(Choice.objects.get(pk=self.python.pk).total_votes, 20)
+
+        out = StringIO()
+        call_command("reconcile_vote_counts", "--fold-shards", stdout=out)
+        self.assertIn("fixed drift on 0", out.getvalue())
+        self.python.refresh_from_db()
+        self.assertEqual(self.python.votes_count, 20)
+        self.assertFalse(shards.exists())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class VoteCastingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.poll = make_poll()
+        self.choice = self.poll.choices.get(text="Python")
+        self.link = VoteLink.objects.create(poll=self.poll)
+
+    def post_vote(self, token=None, choice_id=None):
+        return self.client.post(
+            "/api/vote/",
+            {"token": str(token or self.link.token), "choice_id": str(choice_id or self.choice.id)},
+            format="json",
+        )
+
+    def test_vote_round_trips(self):
+        # SELECT choice+poll+link, then SAVEPOINT, claim UPDATE, INSERT vote,
+        # counter UPDATE, rollup UPDATE, RELEASE (this hour's rollup row exists).
+        PollHourlyStats.objects.create(poll=self.poll, hour=hour_of())
+        with self.assertNumQueries(7):
+            response = self.post_vote()
+        self.assertEqual(response.status_code, 201)
+        self.link.refresh_from_db()
+        self.assertTrue(self.link.used)
+        self.assertIsNotNone(self.link.used_at)
+
+    def test_reused_token_is_rejected(self):
+        self.assertEqual(self.post_vote().status_code, 201)
+        response = self.post_vote()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("votelink", response.data)
+        self.assertEqual(Vote.objects.count(), 1)
+
+    def test_unknown_token_and_foreign_choice(self):
+        other = make_poll(title="Other", choices=("Tea",))
+        response = self.post_vote(token="00000000-0000-0000-0000-000000000000")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("votelink", response.data)
+
+        response = self.post_vote(choice_id=other.choices.get().id)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("choice", response.data)
+
+    def test_race_between_validate_and_create(self):
+        data = {"votelink": str(self.link.token), "choice": str(self.choice.id)}
+        first, second = VoteSerializer(data=data), VoteSerializer(data=data)
+        self.assertTrue(first.is_valid())
+        self.assertTrue(second.is_valid())
+
+        first.save()
+        with self.assertRaises(serializers.ValidationError):
+            second.save()
+        self.choice.refresh_from_db()
+        self.assertEqual(self.choice.votes_count, 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConcurrentVoteTests(TransactionTestCase):
+    def test_parallel_duplicate_submissions_count_once(self):
+        poll = make_poll()
+        choice = poll.choices.get(text="Python")
+        link = VoteLink.objects.create(poll=poll)
+        data = {"votelink": str(link.token), "choice": str(choice.id)}
+
+        barrier = threading.Barrier(8)
+        outcomes = []
+
+        def submit():
+            serializer = VoteSerializer(data=data)
+            valid = serializer.is_valid()
+            barrier.wait()
+            try:
+                if valid:
+                    serializer.save()
+                    outcomes.append("saved")
+                else:
+                    outcomes.append("invalid")
+            except (serializers.ValidationError, OperationalError):
+                outcomes.append("rejected")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes.count("saved"), 1)
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertEqual(Vote.objects.get().votelink_id, link.pk)
+        choice.refresh_from_db()
+        self.assertEqual(choice.votes_count, 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, VOTE_INGESTION_MODE="buffered")
+class BufferedIngestionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.poll = make_poll()
+        self.choice = self.poll.choices.get(text="Python")
+
+    def post_vote(self, link):
+        return self.client.post(
+            "/api/vote/", {"token": str(link.token), "choice_id": str(self.choice.id)}, format="json"
+        )
+
+    def test_votes_are_staged_then_flushed_in_batches(self):
+        links = [VoteLink.objects.create(poll=self.poll) for _ in range(5)]
+        for link in links:
+            self.assertEqual(self.post_vote(link).status_code, 202)
+        self.assertEqual(self.post_vote(links[0]).status_code, 400)
+        self.assertEqual(QueuedVote.objects.count(), 5)
+        self.assertEqual(Vote.objects.count(), 0)
+
+        self.assertEqual(flush_queued_votes(batch_size=3), 3)
+        self.assertEqual(flush_queued_votes(batch_size=3), 2)
+        self.assertEqual(flush_queued_votes(batch_size=3), 0)
+
+        self.assertEqual(Vote.objects.count(), 5)
+        self.assertFalse(VoteLink.objects.filter(used=False).exists())
+        self.choice.refresh_from_db()
+        self.assertEqual(self.choice.votes_count, 5)
+
+    def test_flush_commit_hooks_forget_tokens_and_bump_versions(self):
+        link = VoteLink.objects.create(poll=self.poll)
+        self.post_vote(link)
+        self.assertFalse(tokens.resolve(str(link.token)).used)
+        version = poll_version(self.poll.pk)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            flush_queued_votes()
+        self.assertGreaterEqual(len(callbacks), 3)
+        self.assertNotEqual(poll_version(self.poll.pk), version)
+        self.assertTrue(tokens.resolve(str(link.token)).used)
+
+    def test_flush_metrics_are_readable_from_another_process(self):
+        for _ in range(2):
+            self.post_vote(VoteLink.objects.create(poll=self.poll))
+        flush_queued_votes()
+        # The web process does not share the flusher's local-memory cache.
+        cache.clear()
+
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        data = admin.get("/api/admin/vote-queue/").data
+        self.assertEqual(data["flushed_total"], 2)
+        self.assertEqual(data["discarded_total"], 0)
+        self.assertEqual(data["last_flush_size"], 2)
+        self.assertIsNotNone(data["last_flush_at"])
+
+    def test_flushed_votes_keep_their_received_time(self):
+        self.post_vote(VoteLink.objects.create(poll=self.poll))
+        received_at = timezone.now() - timedelta(hours=3)
+        QueuedVote.objects.update(received_at=received_at)
+        flush_queued_votes()
+
+        self.assertEqual(Vote.objects.get().created_at, received_at)
+        incremental = list(PollHourlyStats.objects.filter(votes__gt=0).values_list("hour", "votes"))
+        self.assertEqual(incremental, [(hour_of(received_at), 1)])
+        PollHourlyStats.objects.all().delete()
+        call_command("backfill_rollups", stdout=StringIO())
+        backfilled = list(PollHourlyStats.objects.filter(votes__gt=0).values_list("hour", "votes"))
+        self.assertEqual(backfilled, incremental)
+
+    def test_replayed_queue_rows_are_counted_at_most_once(self):
+        link = VoteLink.objects.create(poll=self.poll)
+        self.post_vote(link)
+        flush_queued_votes()
+        # Simulate a worker that crashed after commit and replays its batch.
+        QueuedVote.objects.create(token=link.token, poll=self.poll, choice=self.choice)
+        flush_queued_votes()
+
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertFalse(QueuedVote.objects.exists())
+        self.choice.refresh_from_db()
+        self.assertEqual(self.choice.votes_count, 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PollAdminQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+
+    def add_polls(self, count, choices=3, links=5):
+        for i in range(count):
+            poll = make_poll(title=f"Poll {i}", choices=[f"Choice {n}" for n in range(choices)])
+            VoteLink.objects.bulk_create(VoteLink(poll=poll, used=n == 0) for n in range(links))
+        return poll
+
+    def test_list_query_count_is_independent_of_size(self):
+        self.add_polls(2)
+        with self.assertNumQueries(2):
+            small = self.client.get("/api/polls/")
+        self.add_polls(10, choices=8, links=40)
+        with self.assertNumQueries(2):
+            large = self.client.get("/api/polls/")
+
+        self.assertEqual(len(small.data["results"]), 2)
+        self.assertEqual(len(large.data["results"]), 12)
+        first = large.data["results"][0]
+        self.assertNotIn("vote_links", first)
+        self.assertEqual(first["vote_links_count"], 40)
+        self.assertEqual(first["used_links_count"], 1)
+        self.assertEqual(len(first["choices"]), 8)
+
+    def test_retrieve_query_count_is_independent_of_size(self):
+        poll = self.add_polls(1, choices=12, links=60)
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/polls/{poll.id}/")
+        self.assertEqual(len(response.data["choices"]), 12)
+
+    def test_vote_links_sub_endpoint_is_paginated(self):
+        poll = self.add_polls(1, links=150)
+        response = self.client.get(f"/api/polls/{poll.id}/vote-links/")
+        self.assertEqual(len(response.data["results"]), 100)
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 50)
+        self.assertIsNone(response.data["next"])
+
+
+class PollChoiceEditTests(TestCase):
+    def setUp(self):
+        self.poll = make_poll(choices=("Python", "JavaScript", "Go"))
+        self.python = self.poll.choices.get(text="Python")
+        self.link = VoteLink.objects.create(poll=self.poll)
+        Vote.objects.create(poll=self.poll, choice=self.python, votelink=self.link)
+
+    def edit(self, choices):
+        serializer = PollAdminSerializer(self.poll, data={"choices": choices}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def current(self):
+        return [{"id": choice.id, "text": choice.text} for choice in self.poll.choices.order_by("text")]
+
+    def test_editing_text_keeps_votes(self):
+        choices = [dict(c, text="Python 3") if c["id"] == self.python.id else c for c in self.current()]
+        self.edit(choices)
+        self.python.refresh_from_db()
+        self.assertEqual(self.python.text, "Python 3")
+        self.assertEqual(Vote.objects.get().choice_id, self.python.id)
+
+    def test_only_removed_choices_are_deleted(self):
+        kept = [c for c in self.current() if c["text"] != "Go"]
+        self.edit(kept + [{"text": "Rust"}])
+        self.assertEqual(
+            sorted(self.poll.choices.values_list("text", flat=True)), ["JavaScript", "Python", "Rust"]
+        )
+        self.assertTrue({c["id"] for c in kept} <= set(self.poll.choices.values_list("id", flat=True)))
+        self.assertEqual(Vote.objects.count(), 1)
+
+    def test_removing_a_voted_choice_is_refused(self):
+        with self.assertRaises(serializers.ValidationError):
+            self.edit([c for c in self.current() if c["text"] != "Python"])
+        self.assertEqual(self.poll.choices.count(), 3)
+        self.assertEqual(Vote.objects.count(), 1)
+
+    def test_foreign_choice_id_is_refused(self):
+        other = make_poll(title="Other", choices=("Tea",)).choices.get()
+        with self.assertRaises(serializers.ValidationError):
+            self.edit(self.current() + [{"id": other.id, "text": "Coffee"}])
+        other.refresh_from_db()
+        self.assertEqual(other.text, "Tea")
+
+    def test_edit_query_count_is_independent_of_size(self):
+        # Rename one choice, drop one and add two, before and after the poll
+        # grows by 200 choices.
+        def run():
+            choices = self.current()
+            untouched, renamed, dropped = choices[:-2], choices[-2], choices[-1]
+            if dropped["id"] == self.python.id:
+                renamed, dropped = dropped, renamed
+            renamed = dict(renamed, text=renamed["text"] + "!")
+            with CaptureQueriesContext(connection) as queries:
+                self.edit(untouched + [renamed, {"text": "New A"}, {"text": "New B"}])
+            return len(queries)
+
+        small = run()
+        Choice.objects.bulk_create(Choice(poll=self.poll, text=f"Extra {i:03}") for i in range(200))
+        self.assertEqual(run(), small)
+        self.assertEqual(Vote.objects.count(), 1)
+
+    def test_create_bulk_inserts_choices(self):
+        serializer = PollAdminSerializer(data={
+            "title": "Bulk", "description": "", "choices": [{"text": f"Choice {i}"} for i in range(50)],
+        })
+        serializer.is_valid(raise_exception=True)
+        # SAVEPOINT, poll INSERT, one choices INSERT, RELEASE.
+        with self.assertNumQueries(4):
+            poll = serializer.save()
+        self.assertEqual(poll.choices.count(), 50)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, METRICS_SAMPLE_RATE=1.0, METRICS_QUERY_BUDGET=2)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        self.poll = make_poll()
+        metrics.registry.reset()
+
+    def test_records_latency_queries_and_budget_overruns(self):
+        self.client.get("/api/polls/")
+        with self.assertLogs("core.metrics", "WARNING"):
+            self.client.get(f"/api/polls/{self.poll.id}/")
+        data = self.client.get("/api/admin/metrics/").json()
+
+        views = {row["view"]: row for row in data["views"]}
+        self.assertEqual(views["polls-list"]["requests"], 1)
+        self.assertEqual(views["polls-list"]["queries"], 2)
+        self.assertEqual(views["polls-list"]["latency_buckets"]["+Inf"], 1)
+        self.assertEqual(views["polls-list"]["over_budget"], 0)
+        self.assertEqual(views["polls-detail"]["over_budget"], 1)
+        self.assertGreater(views["polls-detail"]["db_seconds"], 0)
+        [flagged] = data["over_budget"]
+        self.assertEqual(flagged["path"], f"/api/polls/{self.poll.id}/")
+        self.assertEqual(flagged["queries"], 3)
+        self.assertIn("SELECT", flagged["most_repeated"]["sql"])
+
+    def test_prometheus_format(self):
+        self.client.get("/api/polls/")
+        response = self.client.get("/api/admin/metrics/", {"format": "prometheus"})
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn("# TYPE pollify_request_duration_seconds histogram", body)
+        self.assertIn('pollify_request_duration_seconds_bucket{view="polls-list",method="GET",le="+Inf"} 1', body)
+        self.assertIn('pollify_request_queries_total{view="polls-list",method="GET"} 2', body)
+
+    def test_unsampled_requests_are_not_recorded(self):
+        with self.settings(METRICS_SAMPLE_RATE=0):
+            self.client.get("/api/polls/")
+        self.assertEqual(metrics.registry.snapshot()["views"], [])
+
+    def test_admin_only(self):
+        self.assertEqual(APIClient().get("/api/admin/metrics/").status_code, 401)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def collect(self, url, **params):
+        seen = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(poll["title"] for poll in response.data["results"])
+            if not response.data["next"]:
+                return seen
+            response = self.client.get(response.data["next"])
+
+    def test_public_polls_walk_every_page_once(self):
+        for i in range(7):
+            make_poll(title=f"Open {i}")
+        titles = self.collect("/api/public-polls/", page_size=3)
+        self.assertEqual(sorted(titles), sorted(f"Open {i}" for i in range(7)))
+
+    def test_closed_polls_are_ordered_by_end_at(self):
+        now = timezone.now()
+        for i in range(5):
+            make_poll(
+                title=f"Closed {i}",
+                start_at=now - timedelta(days=10),
+                end_at=now - timedelta(days=i + 1),
+            )
+        make_poll(title="Still open")
+        titles = self.collect("/api/public-closed-polls/", page_size=2)
+        self.assertEqual(titles, [f"Closed {i}" for i in range(5)])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AdminAnalyticsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+
+    def cast(self, poll, text, count):
+        choice = poll.choices.get(text=text)
+        for _ in range(count):
+            serializer = VoteSerializer(
+                data={"votelink": str(VoteLink.objects.create(poll=poll).token), "choice": str(choice.id)}
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+    def test_analytics_from_aggregates(self):
+        now = timezone.now()
+        busy = make_poll(title="Busy")
+        quiet = make_poll(title="Quiet", counter_shards=3)
+        make_poll(title="Upcoming", start_at=now + timedelta(days=1), end_at=now + timedelta(days=2))
+        make_poll(title="Closed", start_at=now - timedelta(days=3), end_at=now - timedelta(days=1))
+        self.cast(busy, "Python", 3)
+        self.cast(busy, "JavaScript", 2)
+        self.cast(quiet, "Python", 1)
+        # Created outside the instrumented API paths, so never in the rollups.
+        VoteLink.objects.create(poll=quiet)
+
+        with self.assertNumQueries(6):
+            data = self.client.get("/api/admin/analytics/").data
+
+        self.assertEqual(data["total_polls"], 4)
+        self.assertEqual(data["votable_polls"], 2)
+        self.assertEqual(data["upcoming_polls"], 1)
+        self.assertEqual(data["closed_polls"], 1)
+        self.assertEqual(data["total_votes"], 6)
+        self.assertEqual(data["todays_votes"], 6)
+        self.assertEqual(data["unique_voters"], 6)
+        self.assertEqual(data["total_votelinks"], 7)
+        self.assertEqual(data["used_votelinks"], 6)
+        self.assertEqual(data["most_voted_poll"], "Busy")
+        self.assertIn(data["least_voted_poll"], ("Upcoming", "Closed"))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class RollupTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        self.poll = make_poll()
+        self.choice = self.poll.choices.get(text="Python")
+
+    def test_write_paths_maintain_hourly_rollup(self):
+        response = self.client.post(
+            f"/api/polls/{self.poll.id}/bulk-generate-links/",
+            {"invitees": [{"email": f"v{i}@example.com", "name": "V"} for i in range(3)]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        links = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        for link in links[:2]:
+            self.client.post("/api/vote/", {"token": link["token"], "choice_id": str(self.choice.id)}, format="json")
+
+        row = PollHourlyStats.objects.get(poll=self.poll)
+        self.assertEqual((row.votes, row.links_issued), (2, 3))
+
+        stats = self.client.get(f"/api/polls/{self.poll.id}/stats/").data
+        self.assertEqual(stats["total_votes"], 2)
+        self.assertEqual(stats["todays_votes"], 2)
+        self.assertEqual(stats["links_issued"], 3)
+
+        series = self.client.get(f"/api/polls/{self.poll.id}/timeseries/", {"interval": "hour"}).data
+        self.assertEqual(series["series"][0]["votes"], 2)
+        self.assertEqual(
+            self.client.get("/api/admin/analytics/timeseries/", {"interval": "week"}).status_code, 400
+        )
+
+    def test_backfill_matches_incremental_rollup(self):
+        for _ in range(4):
+            link = VoteLink.objects.create(poll=self.poll)
+            serializer = VoteSerializer(data={"votelink": str(link.token), "choice": str(self.choice.id)})
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        self.assertEqual(PollHourlyStats.objects.get(poll=self.poll).votes, 4)
+
+        PollHourlyStats.objects.all().delete()
+        call_command("backfill_rollups", stdout=StringIO())
+        row = PollHourlyStats.objects.get(poll=self.poll)
+        self.assertEqual((row.votes, row.links_issued), (4, 4))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ResultsCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        self.poll = make_poll()
+        self.choice = self.poll.choices.get(text="Python")
+
+    def test_public_detail_is_served_from_cache_until_poll_changes(self):
+        url = f"/api/public-polls/{self.poll.id}/"
+        first = self.client.get(url).data
+        hits = cache_stats()["hits"]
+        # Only the poll-state lookup for the ETag; the payload comes from cache.
+        with self.assertNumQueries(1):
+            second = self.client.get(url).data
+        self.assertEqual(first, second)
+        self.assertEqual(cache_stats()["hits"], hits + 1)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Choice.objects.create(poll=self.poll, text="Rust")
+        # Not bumped before commit, so readers cannot cache uncommitted data.
+        self.assertEqual(len(self.client.get(url).data["choices"]), 2)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(self.client.get(url).data["choices"]), 3)
+
+    def test_vote_invalidates_stats(self):
+        url = f"/api/polls/{self.poll.id}/stats/"
+        self.assertEqual(self.client.get(url).data["total_votes"], 0)
+        link = VoteLink.objects.create(poll=self.poll)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/vote/", {"token": str(link.token), "choice_id": str(self.choice.id)}, format="json"
+            )
+        self.assertEqual(self.client.get(url).data["total_votes"], 1)
+
+    def test_stats_activity_is_read_fresh_on_cache_hits(self):
+        url = f"/api/polls/{self.poll.id}/stats/"
+        self.assertEqual(self.client.get(url).data["links_issued"], 0)
+        PollHourlyStats.objects.create(poll=self.poll, hour=hour_of(), votes=2, links_issued=4)
+        data = self.client.get(url).data
+        self.assertEqual((data["todays_votes"], data["links_issued"]), (2, 4))
+
+    @override_settings(CLOSED_RESULTS_CACHE_TIMEOUT=300)
+    def test_closed_polls_cache_bounded_and_open_polls_until_next_transition(self):
+        now = timezone.now()
+        self.assertEqual(timeout_for(Poll(end_at=now - timedelta(seconds=1)), now), 300)
+        self.assertEqual(timeout_for(Poll(end_at=now + timedelta(seconds=30)), now), 30)
+        self.assertEqual(timeout_for(Poll(end_at=now + timedelta(days=1)), now), 60)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PollStateTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.polls = {
+            "open": make_poll(title="open"),
+            "undated": make_poll(title="undated", start_at=None, end_at=None),
+            "closed": make_poll(title="closed", start_at=now - timedelta(days=2), end_at=now - timedelta(days=1)),
+            "upcoming": make_poll(title="upcoming", start_at=now + timedelta(days=1), end_at=now + timedelta(days=2)),
+            "inactive": make_poll(title="inactive", is_active=False),
+        }
+
+    def test_annotations_match_properties_and_filters(self):
+        expected = {"open": "open", "undated": "open", "closed": "closed", "upcoming": "upcoming", "inactive": "inactive"}
+        with clock.frozen():
+            for poll in Poll.objects.with_state():
+                plain = Poll.objects.get(pk=poll.pk)
+                self.assertEqual(poll.current_state, expected[poll.title])
+                self.assertEqual(poll.currently_votable, plain.is_votable)
+                self.assertEqual(poll.results_visible, plain.show_results)
+            for state in POLL_STATES:
+                titles = {poll.title for poll in Poll.objects.in_state(state)}
+                self.assertEqual(titles, {title for title, value in expected.items() if value == state})
+
+    def test_properties_use_annotations_and_request_clock(self):
+        later = timezone.now() + timedelta(days=3)
+        poll = Poll.objects.with_state(now=later).get(pk=self.polls["open"].pk)
+        self.assertTrue(poll.show_results)
+        self.assertFalse(poll.is_votable)
+        with clock.frozen(later):
+            self.assertTrue(self.polls["open"].show_results)
+        self.assertFalse(self.polls["open"].show_results)
+
+    def test_admin_list_filters_by_state(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        response = client.get("/api/polls/", {"state": "open"})
+        self.assertEqual({poll["title"] for poll in response.data["results"]}, {"open", "undated"})
+        self.assertTrue(all(poll["is_votable"] for poll in response.data["results"]))
+        self.assertEqual(client.get("/api/polls/", {"state": "soon"}).status_code, 400)
+
+    def test_public_list_renders_annotated_state(self):
+        response = APIClient().get("/api/public-polls/")
+        results = {poll["title"]: poll for poll in response.data["results"]}
+        self.assertEqual(set(results), {"open", "undated"})
+        self.assertTrue(results["undated"]["is_votable"])
+        self.assertFalse(results["open"]["show_results"])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SchedulerTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.poll = make_poll(end_at=self.now + timedelta(minutes=1))
+        Choice.objects.filter(poll=self.poll, text="Python").update(votes_count=3)
+        self.scheduler = LifecycleScheduler(horizon=timedelta(minutes=5))
+        tokens.resolver.clear()
+
+    def test_save_stores_state(self):
+        self.assertEqual(self.poll.state, "open")
+        self.poll.start_at = self.now + timedelta(seconds=30)
+        self.poll.save(update_fields=["start_at"])
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.state, "upcoming")
+
+    def test_close_freezes_results_and_warms_cache(self):
+        self.assertEqual(self.scheduler.rescan(self.now), 0)
+        self.assertEqual(self.scheduler.next_due(), self.poll.end_at)
+        self.assertEqual(self.scheduler.run_due(self.poll.end_at), 0)
+
+        Poll.objects.filter(pk=self.poll.pk).update(end_at=self.now - timedelta(seconds=1))
+        self.assertEqual(self.scheduler.run_due(self.now + timedelta(minutes=2)), 1)
+        self.poll.refresh_from_db()
+        self.assertEqual(self.poll.state, "closed")
+        snapshot = PollResultsSnapshot.objects.get(poll=self.poll)
+        self.assertEqual(snapshot.total_votes, 3)
+
+        link = VoteLink.objects.create(poll=self.poll)
+        with self.assertNumQueries(1):
+            response = APIClient().get("/api/poll-results/", {"token": str(link.token)})
+        self.assertEqual({r["text"]: r["votes"] for r in response.data["results"]}, {"Python": 3, "JavaScript": 0})
+
+    def test_queued_votes_delay_the_snapshot(self):
+        Poll.objects.filter(pk=self.poll.pk).update(end_at=self.now - timedelta(seconds=1))
+        link = VoteLink.objects.create(poll=self.poll)
+        QueuedVote.objects.create(token=link.token, poll=self.poll, choice=self.poll.choices.first())
+        self.assertEqual(self.scheduler.rescan(self.now), 1)
+        self.assertFalse(PollResultsSnapshot.objects.exists())
+
+        QueuedVote.objects.all().delete()
+        self.scheduler.rescan(self.now)
+        self.assertTrue(PollResultsSnapshot.objects.filter(poll=self.poll).exists())
+
+    def test_reopening_drops_the_snapshot(self):
+        self.poll.end_at = self.now - timedelta(seconds=1)
+        self.poll.save()
+        self.scheduler.rescan(self.now)
+        self.assertTrue(PollResultsSnapshot.objects.exists())
+
+        self.poll.end_at = self.now + timedelta(days=1)
+        self.poll.save()
+        self.scheduler.rescan(self.now)
+        self.assertFalse(PollResultsSnapshot.objects.exists())
+
+    def test_command_runs_once(self):
+        Poll.objects.filter(pk=self.poll.pk).update(state="upcoming")
+        out = StringIO()
+        call_command("run_scheduler", "--once", stdout=out)
+        self.assertIn("Applied 1 poll state changes", out.getvalue())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        now = timezone.now()
+        self.open = make_poll(title="Open")
+        self.closed = make_poll(
+            title="Closed", start_at=now - timedelta(days=2), end_at=now - timedelta(days=1)
+        )
+
+    def test_open_poll_revalidates_and_changes_etag_on_vote(self):
+        url = f"/api/public-polls/{self.open.id}/"
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertIn("max-age=5", response["Cache-Control"])
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], etag)
+
+        link = VoteLink.objects.create(poll=self.open)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/vote/",
+                {"token": str(link.token), "choice_id": str(self.open.choices.first().id)},
+                format="json",
+            )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_closed_poll_is_revalidated(self):
+        response = self.client.get(f"/api/public-polls/{self.closed.id}/")
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=60", response["Cache-Control"])
+
+        link = VoteLink.objects.create(poll=self.closed)
+        response = self.client.get("/api/poll-results/", {"token": str(link.token)})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+        again = self.client.get(
+            "/api/poll-results/", {"token": str(link.token)}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(again.status_code, 304)
+
+    def test_by_token_etag_tracks_has_voted(self):
+        link = VoteLink.objects.create(poll=self.open)
+        url = "/api/polls/by-token/"
+        etag = self.client.get(url, {"token": str(link.token)})["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/vote/",
+                {"token": str(link.token), "choice_id": str(self.open.choices.first().id)},
+                format="json",
+            )
+        response = self.client.get(url, {"token": str(link.token)}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["has_voted"])
+
+    def test_closed_list_not_modified_until_another_poll_closes(self):
+        url = "/api/public-closed-polls/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Poll.objects.filter(pk=self.open.pk).update(end_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PublicPayloadTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.polls = [
+            make_poll(title="Open"),
+            make_poll(title="Closed", start_at=now - timedelta(days=2), end_at=now - timedelta(days=1)),
+            make_poll(title="Upcoming", start_at=now + timedelta(days=1), end_at=None),
+            make_poll(title="Inactive", is_active=False, choices=()),
+        ]
+        closed = self.polls[1]
+        Poll.objects.filter(pk=closed.pk).update(counter_shards=2)
+        choice = closed.choices.first()
+        Choice.objects.filter(pk=choice.pk).update(votes_count=3)
+        ChoiceCounterShard.objects.create(choice=choice, shard=1, count=2)
+
+    def test_matches_the_serializer(self):
+        rows = Poll.objects.filter(pk__in=[p.pk for p in self.polls]).order_by("title").values(*POLL_FIELDS)
+        expected = [
+            PollPublicSerializer(poll).data
+            for poll in Poll.objects.filter(pk__in=[p.pk for p in self.polls]).order_by("title")
+        ]
+        self.assertEqual(JSONRenderer().render(public_poll_payloads(rows)), JSONRenderer().render(expected))
+
+    def test_list_queries_do_not_grow_with_polls(self):
+        client = APIClient()
+        with self.assertNumQueries(2):
+            response = client.get("/api/public-polls/")
+        self.assertEqual([poll["title"] for poll in response.data["results"]], ["Open"])
+
+        for i in range(5):
+            make_poll(title=f"Open {i}")
+        with self.assertNumQueries(2):
+            response = client.get("/api/public-polls/", {"page_size": 3})
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertEqual(len(client.get(response.data["next"]).data["results"]), 3)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FastJSONTests(TestCase):
+    def test_renders_like_drf(self):
+        poll = make_poll(title="Caf\u00e9 \u2028 poll")
+        VoteLink.objects.create(poll=poll, invitee_email="a@example.com")
+        data = PollAdminSerializer(poll).data
+        data["raw"] = {"token": poll.vote_links.get().token, "at": timezone.now(), "n": 2**70}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertIn(b"\\u2028", FastJSONRenderer().render(data))
+
+    def test_parses_requests(self):
+        client = APIClient()
+        link = VoteLink.objects.create(poll=make_poll())
+        body = json.dumps({"token": str(link.token), "choice_id": str(link.poll.choices.first().id)})
+        response = client.post("/api/vote/", body, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+
+        response = client.post("/api/vote/", "{nope", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()["detail"].startswith("JSON parse error"))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TokenResolutionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.poll = make_poll()
+        self.link = VoteLink.objects.create(poll=self.poll)
+        tokens.resolver.clear()
+
+    def by_token(self, token):
+        return self.client.get("/api/polls/by-token/", {"token": token})
+
+    def test_malformed_and_unknown_tokens_skip_the_database(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.by_token("not-a-uuid").status_code, 404)
+            self.assertEqual(self.client.get("/api/poll-results/", {"token": "x' OR 1=1"}).status_code, 404)
+
+        unknown = "00000000-0000-0000-0000-000000000000"
+        with self.assertNumQueries(1):
+            self.assertEqual(self.by_token(unknown).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.by_token(unknown).status_code, 404)
+
+    def test_known_token_is_cached_until_it_is_used(self):
+        self.assertFalse(self.by_token(str(self.link.token)).data["has_voted"])
+        with self.assertNumQueries(0):
+            self.assertFalse(self.by_token(str(self.link.token)).data["has_voted"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/vote/",
+                {"token": str(self.link.token), "choice_id": str(self.poll.choices.first().id)},
+                format="json",
+            )
+        self.assertTrue(self.by_token(str(self.link.token)).data["has_voted"])
+
+    def test_entries_expire(self):
+        resolver = tokens.TokenResolver(size=1, ttl=0.01)
+        other = VoteLink.objects.create(poll=self.poll)
+        resolver.resolve(self.link.token)
+        resolver.resolve(other.token)
+        self.assertEqual(len(resolver.links), 1)
+        self.assertIsNone(resolver.links.get(self.link.token))
+        threading.Event().wait(0.02)
+        self.assertIsNone(resolver.links.get(other.token))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BulkLinkGenerationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        self.poll = make_poll()
+        self.url = f"/api/polls/{self.poll.id}/bulk-generate-links/"
+
+    def test_streams_ndjson_in_input_order(self):
+        invitees = [{"email": f"v{i}@example.com", "name": f"Voter {i}"} for i in range(1200)]
+        response = self.client.post(self.url, {"invitees": invitees}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([row["email"] for row in rows], [i["email"] for i in invitees])
+        self.assertTrue(rows[0]["url"].endswith(f"/vote/{rows[0]['token']}"))
+        self.assertEqual(VoteLink.objects.filter(poll=self.poll).count(), 1200)
+
+    def test_streams_csv(self):
+        response = self.client.post(
+            self.url + "?output=csv", {"invitees": [{"email": "a@example.com", "name": "A"}]}, format="json"
+        )
+        rows = list(csv.DictReader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0]["email"], "a@example.com")
+        self.assertTrue(VoteLink.objects.filter(token=rows[0]["token"]).exists())
+
+    def test_invalid_entry_rejects_whole_batch(self):
+        invitees = [{"email": "ok@example.com"}, {"email": "not-an-email"}, "nope"]
+        response = self.client.post(self.url, {"invitees": invitees}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in response.data["invitees"]], [1, 2])
+        self.assertFalse(VoteLink.objects.exists())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class VoteExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        self.poll = make_poll()
+        choices = list(self.poll.choices.order_by("text"))
+        for i in range(5):
+            link = VoteLink.objects.create(poll=self.poll, invitee_email=f"v{i}@example.com", invitee_name=f"V {i}")
+            Vote.objects.create(poll=self.poll, choice=choices[i % 2], votelink=link)
+        self.url = f"/api/polls/{self.poll.id}/export/"
+
+    def test_streams_csv_oldest_first(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("attachment", response["Content-Disposition"])
+        rows = list(csv.DictReader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row["email"] for row in rows], [f"v{i}@example.com" for i in range(5)])
+        self.assertEqual([row["choice"] for row in rows[:2]], ["JavaScript", "Python"])
+        self.assertTrue(rows[0]["voted_at"].endswith("Z"))
+
+    def test_command_writes_ndjson(self):
+        out = StringIO()
+        call_command("export_poll", str(self.poll.id), "--output", "ndjson", "--chunk-size", "2", stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(set(rows[0]), {"vote_id", "voted_at", "choice_id", "choice", "token", "email", "name"})
+
+    def test_parquet_is_columnar(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        response = self.client.get(self.url, {"output": "parquet"})
+        table = pq.read_table(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(table.column("name").to_pylist(), [f"V {i}" for i in range(5)])
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(self.url, {"output": "xml"}).status_code, 400)
+
+    def test_async_deployments_stream_chunk_by_chunk(self):
+        with override_settings(ASYNC_VIEWS=True):
+            response = self.client.get(self.url, {"output": "ndjson"})
+        self.assertTrue(response.is_async)
+
+        async def collect():
+            chunks = exports.aiterate(exports.export_votes(self.poll, "ndjson"))
+            return [chunk async for chunk in chunks]
+
+        chunks = async_to_sync(collect)()
+        self.assertEqual(b"".join(chunks), b"".join(exports.export_votes(self.poll, "ndjson")))
+
+
+class MediaRootMixin:
+    """
+    Job inputs and outputs go through default_storage; keep them in a temp dir.
+    """
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class InviteeImportTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        self.poll = make_poll()
+        self.url = f"/api/polls/{self.poll.id}/import-invitees/"
+
+    def upload(self, name, content, query=""):
+        """
+        Upload, run the queued job, and return its status payload.
+        """
+        upload = SimpleUploadedFile(name, content.encode())
+        response = self.client.post(self.url + query, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "queued")
+        self.assertEqual(jobs.run_pending(), 1)
+        return self.client.get(f"/api/jobs/{response.data['id']}/").data
+
+    def test_csv_import_dedupes_and_reports(self):
+        rows = ["email,name"] + [f"v{i % 1500}@example.com,Voter {i}" for i in range(2500)]
+        rows += ["not-an-email,Bad", ",Anonymous"]
+        job = self.upload("invitees.csv", "\n".join(rows))
+
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["progress"], 2502)
+        result = job["result"]
+        self.assertEqual((result["created"], result["duplicates"], result["invalid"]), (1501, 1000, 1))
+        self.assertEqual(result["errors"][0]["line"], 2502)
+        self.assertEqual(VoteLink.objects.filter(poll=self.poll).count(), 1501)
+        self.assertFalse(os.listdir(os.path.join(settings.MEDIA_ROOT, "jobs", job["id"])))
+
+    def test_ndjson_import_by_query_param(self):
+        lines = [json.dumps({"email": "A@example.com"}), "{broken", "", json.dumps({"email": "a@example.com"})]
+        result = self.upload("upload.txt", "\n".join(lines), "?input=ndjson")["result"]
+        self.assertEqual((result["created"], result["duplicates"], result["invalid"]), (1, 1, 1))
+
+    def test_unreadable_file_fails_job(self):
+        upload = SimpleUploadedFile("bad.csv", b"email\n\xff\xfe\x00bad")
+        self.client.post(self.url, {"file": upload}, format="multipart")
+        jobs.run_pending()
+        failed = Job.objects.get(status=Job.FAILED)
+        self.assertIn("Could not read file", failed.error)
+
+    def test_unknown_format_rejected(self):
+        response = self.client.post(
+            self.url, {"file": SimpleUploadedFile("invitees.xlsx", b"x")}, format="multipart"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"v{i}@example.com")
+        self.assertTrue(all(f"v{i}@example.com" in bloom for i in range(1000)))
+        false_positives = sum(f"x{i}@example.com" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, BULK_LINKS_INLINE_LIMIT=2)
+class JobQueueTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        self.poll = make_poll()
+
+    def test_large_bulk_generation_is_queued_and_downloadable(self):
+        invitees = [{"email": f"v{i}@example.com", "name": f"Voter {i}"} for i in range(3)]
+        response = self.client.post(
+            f"/api/polls/{self.poll.id}/bulk-generate-links/", {"invitees": invitees}, format="json"
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(VoteLink.objects.exists())
+
+        jobs.run_pending()
+        job = Job.objects.get(pk=response.data["id"])
+        self.assertEqual((job.status, job.result["created"]), (Job.SUCCEEDED, 3))
+
+        download = self.client.get(f"/api/jobs/{job.pk}/output/")
+        rows = [json.loads(line) for line in b"".join(download.streaming_content).splitlines()]
+        self.assertEqual([row["email"] for row in rows], [i["email"] for i in invitees])
+        self.assertEqual(VoteLink.objects.filter(poll=self.poll).count(), 3)
+
+    def test_rerun_bulk_generation_reuses_issued_links(self):
+        invitees = [{"email": f"v{i}@example.com", "name": f"Voter {i}"} for i in range(3)]
+        job = jobs.enqueue(
+            "bulk_generate_links", {"invitees": invitees, "base_url": "http://x"}, poll=self.poll
+        )
+        with patch("core.tasks.save_output", side_effect=OSError("disk full")), self.assertLogs("core.jobs", "ERROR"):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        issued = {str(token) for token in VoteLink.objects.filter(poll=self.poll).values_list("token", flat=True)}
+        self.assertEqual(len(issued), 3)
+
+        self.assertTrue(jobs.requeue(job))
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result["created"]), (Job.SUCCEEDED, 3))
+        self.assertEqual(VoteLink.objects.filter(poll=self.poll).count(), 3)
+
+        download = self.client.get(f"/api/jobs/{job.pk}/output/")
+        rows = [json.loads(line) for line in b"".join(download.streaming_content).splitlines()]
+        self.assertEqual({row["token"] for row in rows}, issued)
+
+    def test_bulk_emails_are_sent_by_worker(self):
+        invitees = [
+            {"name": "A", "email": "a@example.com", "link": "http://x/vote/1"},
+            {"name": "B", "email": "", "link": "http://x/vote/2"},
+        ]
+        response = self.client.post(
+            "/api/polls/send-bulk-vote-links/", {"invitees": invitees, "poll_title": "Lunch"}, format="json"
+        )
+        self.assertEqual((response.status_code, response.data["skipped"]), (202, 1))
+        self.assertEqual(len(mail.outbox), 0)
+
+        jobs.run_pending()
+        self.assertEqual([m.to for m in mail.outbox], [["a@example.com"]])
+        self.assertEqual(mail.outbox[0].subject, "You're invited to vote: Lunch")
+        job = Job.objects.get(pk=response.data["job"]["id"])
+        self.assertEqual(job.result, {"pending": 0, "sent": 1, "failed": 0})
+
+    def test_handler_errors_mark_job_failed(self):
+        job = jobs.enqueue("bulk_generate_links", {"invitees": [], "base_url": ""}, poll=None)
+        with self.assertLogs("core.jobs", "ERROR"):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertTrue(job.error)
+
+    def test_claim_is_exclusive(self):
+        job = jobs.enqueue("reconcile_vote_counts")
+        self.assertEqual(jobs.claim_next().pk, job.pk)
+        self.assertIsNone(jobs.claim_next())
+
+    @override_settings(JOB_LEASE_SECONDS=60)
+    def test_jobs_of_dead_workers_are_reclaimed_once_their_lease_expires(self):
+        job = jobs.enqueue("reconcile_vote_counts", {"dry_run": True})
+        started_at = jobs.claim_next().started_at
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(seconds=30))
+        self.assertIsNone(jobs.claim_next())
+
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(seconds=90))
+        with self.assertLogs("core.jobs", "WARNING"):
+            reclaimed = jobs.claim_next()
+        self.assertEqual((reclaimed.pk, reclaimed.started_at), (job.pk, started_at))
+        self.assertIsNone(jobs.claim_next())
+
+        jobs.run(reclaimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+
+    def test_reconcile_endpoint_validates_options(self):
+        response = self.client.post("/api/admin/reconcile-votes/", {"dry_run": "false", "poll": str(self.poll.id)})
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(pk=response.data["id"])
+        self.assertEqual(job.payload, {"poll": str(self.poll.id), "dry_run": False, "fold_shards": False})
+
+        response = self.client.post("/api/admin/reconcile-votes/", {"poll": "not-a-uuid"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("poll", response.data)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_reconcile_endpoint_queues_job(self):
+        response = self.client.post("/api/admin/reconcile-votes/", {"dry_run": True}, format="json")
+        self.assertEqual(response.status_code, 202)
+        call_command("run_workers", workers=0, once=True, stdout=StringIO())
+        job = Job.objects.get(pk=response.data["id"])
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertIn("log", job.result)
+
+
+class FlakyEmailBackend(BaseEmailBackend):
+    """
+    Refuses "refused@" addresses, drops the connection once for "flaky@"
+    ones, and records how often connections were opened.
+    """
+    opened = 0
+    sent = []
+    dropped = set()
+    lock = threading.Lock()
+
+    def open(self):
+        with self.lock:
+            FlakyEmailBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            to = message.to[0]
+            if to.startswith("refused@"):
+                raise smtplib.SMTPRecipientsRefused({to: (550, b"No such user")})
+            with self.lock:
+                if to.startswith("flaky") and to not in self.dropped:
+                    self.dropped.add(to)
+                    raise smtplib.SMTPServerDisconnected("Connection dropped")
+                self.sent.append(to)
+        return len(messages)
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    EMAIL_BACKEND="core.tests.FlakyEmailBackend",
+    BULK_EMAIL_WORKERS=3,
+    BULK_EMAIL_BATCH_SIZE=10,
+)
+class BulkMailerTests(TestCase):
+    def setUp(self):
+        FlakyEmailBackend.opened = 0
+        FlakyEmailBackend.sent = []
+        FlakyEmailBackend.dropped = set()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+
+    def test_pool_reuses_connections(self):
+        recipients = [{"key": i, "email": f"v{i}@example.com", "link": "http://x"} for i in range(100)]
+        batches = [recipients[i:i + 10] for i in range(0, 100, 10)]
+        results = [r for batch in BulkMailer(retry_delay=0).send(batches, "Poll") for r in batch]
+
+        self.assertEqual(sorted(r["key"] for r in results), list(range(100)))
+        self.assertTrue(all(r["error"] is None for r in results))
+        self.assertEqual(len(FlakyEmailBackend.sent), 100)
+        self.assertLessEqual(FlakyEmailBackend.opened, 3)
+
+    def test_failures_are_recorded_per_recipient_and_retried(self):
+        invitees = [{"email": f"v{i}@example.com", "link": "http://x"} for i in range(25)]
+        invitees[3]["email"] = "refused@example.com"
+        invitees[7]["email"] = "flaky@example.com"
+        response = self.client.post("/api/polls/send-bulk-vote-links/", {"invitees": invitees}, format="json")
+        job_id = response.data["job"]["id"]
+
+        with patch("core.mailer.time.sleep"):
+            jobs.run_pending()
+        self.assertEqual(Job.objects.get(pk=job_id).result, {"pending": 0, "sent": 24, "failed": 1})
+        self.assertIn("flaky@example.com", FlakyEmailBackend.sent)
+
+        failed = self.client.get(f"/api/jobs/{job_id}/deliveries/?status=failed").data["results"]
+        self.assertEqual([(d["email"], d["attempts"]) for d in failed], [("refused@example.com", 1)])
+        self.assertIn("SMTPRecipientsRefused", failed[0]["error"])
+        flaky = EmailDelivery.objects.get(email="flaky@example.com")
+        self.assertEqual((flaky.status, flaky.attempts), (EmailDelivery.SENT, 2))
+
+        retry = self.client.post(f"/api/jobs/{job_id}/deliveries/retry/")
+        self.assertEqual((retry.status_code, retry.data["retried"]), (202, 1))
+        jobs.run_pending()
+        refused = EmailDelivery.objects.get(email="refused@example.com")
+        self.assertEqual((refused.status, refused.attempts), (EmailDelivery.FAILED, 2))
+        self.assertEqual(len(FlakyEmailBackend.sent), 24)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AsyncViewTests(TestCase):
+    """
+    The async views must answer exactly like the DRF views they replace.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.factory = AsyncRequestFactory()
+        self.poll = make_poll()
+        self.choice = self.poll.choices.get(text="Python")
+        self.link = VoteLink.objects.create(poll=self.poll)
+
+    async def test_reads_match_sync_views(self):
+        cases = [
+            (async_views.AsyncPublicPollDetailView, f"/api/public-polls/{self.poll.id}/", {"pk": self.poll.id}),
+            (async_views.AsyncPollByTokenView, f"/api/polls/by-token/?token={self.link.token}", {}),
+            (async_views.AsyncPollResultsView, f"/api/poll-results/?token={self.link.token}", {}),
+        ]
+        for view, path, kwargs in cases:
+            expected = await sync_to_async(self.client.get)(path)
+            response = await view.as_view()(self.factory.get(path), **kwargs)
+            with self.subTest(path=path):
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(json.loads(response.content), json.loads(expected.content))
+                self.assertEqual(response.get("ETag"), expected.get("ETag"))
+
+        etag = (await sync_to_async(self.client.get)(cases[0][1]))["ETag"]
+        not_modified = await async_views.AsyncPublicPollDetailView.as_view()(
+            self.factory.get(cases[0][1], headers={"If-None-Match": etag}), pk=self.poll.id
+        )
+        self.assertEqual((not_modified.status_code, not_modified["ETag"]), (304, etag))
+
+        malformed = await async_views.AsyncPollByTokenView.as_view()(
+            self.factory.get("/api/polls/by-token/?token=not-a-uuid")
+        )
+        self.assertEqual(malformed.status_code, 404)
+
+    async def test_vote(self):
+        body = {"token": str(self.link.token), "choice_id": str(self.choice.id)}
+        vote = async_views.AsyncVoteCreateView.as_view()
+        response = await vote(self.factory.post("/api/vote/", body, content_type="application/json"))
+        self.assertEqual(response.status_code, 201)
+        await self.choice.arefresh_from_db()
+        self.assertEqual(self.choice.votes_count, 1)
+
+        again = await vote(self.factory.post("/api/vote/", body, content_type="application/json"))
+        self.assertEqual(again.status_code, 400)
+        self.assertEqual(json.loads(again.content), {"votelink": ["This vote link has already been used."]})
+
+        bad = await vote(self.factory.post("/api/vote/", {"token": "x"}, content_type="application/json"))
+        self.assertEqual(set(json.loads(bad.content)), {"votelink", "choice"})
+
+    @override_settings(VOTE_INGESTION_MODE="buffered")
+    async def test_buffered_vote_is_queued(self):
+        body = {"token": str(self.link.token), "choice_id": str(self.choice.id)}
+        response = await async_views.AsyncVoteCreateView.as_view()(
+            self.factory.post("/api/vote/", body, content_type="application/json")
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(await QueuedVote.objects.filter(token=self.link.token).aexists())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, LIVE_RESULTS_HEARTBEAT=5)
+class LiveResultsTests(TestCase):
+    def setUp(self):
+        self.poll = make_poll()
+        self.choice = self.poll.choices.get(text="Python")
+        self.broadcaster = live.Broadcaster(autostart=False)
+
+    def test_one_query_per_tick_and_deltas_coalesce(self):
+        subscribers = [self.broadcaster.subscribe(self.poll.id)[0] for _ in range(50)]
+        self.choice.record_vote(2)
+        with self.assertNumQueries(1):
+            self.broadcaster.tick()
+        self.assertEqual(subscribers[0].take(), {str(self.choice.id): (2, 2)})
+
+        self.choice.record_vote()
+        self.broadcaster.tick()
+        self.assertEqual(subscribers[0].take(), {str(self.choice.id): (3, 1)})
+        # A subscriber that did not drain in between gets one merged delta.
+        self.assertEqual(subscribers[1].take(), {str(self.choice.id): (3, 3)})
+
+        for subscriber in subscribers:
+            self.broadcaster.unsubscribe(subscriber)
+        self.assertEqual((self.broadcaster.subscribers, self.broadcaster.tallies), ({}, {}))
+
+    @override_settings(ASYNC_VIEWS=False, LIVE_RESULTS_POLL_INTERVAL=5)
+    def test_wsgi_endpoint_answers_one_snapshot_and_client_polls(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("admin", is_staff=True))
+        self.choice.record_vote()
+        with patch.object(live, "broadcaster", self.broadcaster):
+            response = client.get(f"/api/polls/{self.poll.id}/live/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertFalse(response.streaming)
+        body = response.content.decode()
+        self.assertTrue(body.startswith("retry: 5000\n\nevent: snapshot"))
+        self.assertIn(f'"choice_id": "{self.choice.id}", "votes": 1', body)
+        self.assertEqual(self.broadcaster.subscribers, {})
+
+    async def test_async_stream(self):
+        events = live.aevent_stream(self.poll.id, source=self.broadcaster)
+        self.assertIn("event: snapshot", await anext(events))
+        await sync_to_async(self.choice.record_vote)()
+        await sync_to_async(self.broadcaster.tick)()
+        self.assertIn('"delta": 1', await anext(events))
+        await events.aclose()
+        self.assertEqual(self.broadcaster.subscribers, {})
@@ -0,0 +1,211 @@
+"""
+Vote link token resolution for the public token endpoints.
+
+Tokens are checked for UUID format before any query. A known token's link
+and poll are read in one select_related query and kept in a per-process
+LRU (TOKEN_CACHE_SIZE entries, at most TOKEN_CACHE_TTL seconds each). An
+entry is tagged with its poll's version stamp (see results_cache) and only
+used while the stamp is unchanged; votes and poll edits bump it, so a used
+link is not reported unused. Casting a vote does not rely on the cached
+`used` flag anyway: the link is still claimed with a conditional UPDATE.
+
+Unknown tokens go to a second LRU for TOKEN_NEGATIVE_TTL seconds, so bots
+replaying made-up tokens stop reaching the database. Tokens are random
+UUIDs generated by the server, so an unknown token does not appear later.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import NamedTuple
+
+from django.conf import settings
+
+from .models import Poll, VoteLink
+from .results_cache import apoll_version, poll_version
+
+# lookup() result when the caches cannot answer and the database must.
+MISS = object()
+
+
+class TokenLink(NamedTuple):
+    token: uuid.UUID
+    poll: Poll
+    used: bool
+
+
+def parse_token(value):
+    """
+    The token as a UUID, or None if it is not one.
+    """
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe mapping whose entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class TokenResolver:
+    def __init__(self, size=None, ttl=None, negative_ttl=None):
+        size = size or settings.TOKEN_CACHE_SIZE
+        self.links = LRUCache(size, ttl or settings.TOKEN_CACHE_TTL)
+        self.unknown = LRUCache(size, negative_ttl or settings.TOKEN_NEGATIVE_TTL)
+        self.counts = {"hits": 0, "misses": 0, "rejected": 0}
+        self.counts_lock = threading.Lock()
+
+    def resolve(self, value):
+        """
+        The TokenLink for a token, or None for malformed or unknown tokens.
+        """
+        token, link = self.lookup(value)
+        if link is MISS:
+            link = self.fetch(token)
+        return link
+
+    async def aresolve(self, value):
+        token, link = await self.alookup(value)
+        if link is MISS:
+            link = await self.afetch(token)
+        return link
+
+    def lookup(self, value):
+        """
+        Answer from the caches alone: (token, TokenLink), (token, None) for
+        a malformed or unknown token, or (token, MISS).
+        """
+        token = self._screen(value)
+        if token is None:
+            return None, None
+        cached = self.links.get(token)
+        return token, self._check(cached, cached and poll_version(cached[0].poll.pk))
+
+    async def alookup(self, value):
+        token = self._screen(value)
+        if token is None:
+            return None, None
+        cached = self.links.get(token)
+        return token, self._check(cached, cached and await apoll_version(cached[0].poll.pk))
+
+    def fetch(self, token):
+        """
+        Read the link and its poll in one query and cache the outcome.
+        """
+        votelink = VoteLink.objects.select_related("poll").filter(token=token).first()
+        if votelink is None:
+            return self._store_unknown(token)
+        return self._store(token, votelink.poll, votelink.used, poll_version(votelink.poll_id))
+
+    async def afetch(self, token):
+        votelink = await VoteLink.objects.select_related("poll").filter(token=token).afirst()
+        if votelink is None:
+            return self._store_unknown(token)
+        return self._store(token, votelink.poll, votelink.used, await apoll_version(votelink.poll_id))
+
+    def remember(self, token, poll, used):
+        """
+        Cache a link the caller already read from the database.
+        """
+        return self._store(token, poll, used, poll_version(poll.pk))
+
+    async def aremember(self, token, poll, used):
+        return self._store(token, poll, used, await apoll_version(poll.pk))
+
+    def forget(self, *tokens):
+        for token in tokens:
+            self.links.pop(token)
+
+    def clear(self):
+        self.links.clear()
+        self.unknown.clear()
+
+    def stats(self):
+        with self.counts_lock:
+            counts = dict(self.counts)
+        return {**counts, "cached": len(self.links), "unknown_cached": len(self.unknown)}
+
+    def _screen(self, value):
+        token = parse_token(value)
+        if token is None or self.unknown.get(token):
+            self._count("rejected")
+            return None
+        return token
+
+    def _check(self, cached, version):
+        if cached is not None and cached[1] == version:
+            self._count("hits")
+            return cached[0]
+        self._count("misses")
+        return MISS
+
+    def _store(self, token, poll, used, version):
+        # The version is read after the query; a vote committed in between
+        # leaves a stale entry for at most TOKEN_CACHE_TTL.
+        link = TokenLink(token, poll, used)
+        self.links.set(token, (link, version))
+        return link
+
+    def _store_unknown(self, token):
+        self.unknown.set(token, True)
+        return None
+
+    def _count(self, name):
+        with self.counts_lock:
+            self.counts[name] += 1
+
+
+resolver = TokenResolver()
+
+
+def resolve(value):
+    return resolver.resolve(value)
+
+
+async def aresolve(value):
+    return await resolver.aresolve(value)
+
+
+def forget(*tokens):
+    resolver.forget(*tokens)
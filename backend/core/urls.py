@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
+from . import async_views
 from .views import (
     PollViewSet,
     VoteCreateView,
@@ -9,9 +11,20 @@ from .views import (
     MyTokenObtainPairView,
     PublicPollDetailView,
     AdminAnalyticsView,
+    VoteQueueMetricsView,
+    RequestMetricsView,
+    ResultsCacheStatsView,
+    AdminTimeSeriesView,
+    PollTimeSeriesView,
     PollStatsView,
+    PollLiveResultsView,
     PublicClosedPollsView,
     PollByTokenView,
+    JobStatusView,
+    JobOutputView,
+    JobDeliveriesView,
+    RetryDeliveriesView,
+    ReconcileVotesView,
     SendBulkVoteLinksAPIView,
 )
 
@@ -23,18 +36,46 @@ urlpatterns = [
     path("token/", MyTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
 
-    # Public voting endpoints
-    path("vote/", VoteCreateView.as_view(), name="vote-create"),
+    # Public voting endpoints. Under ASGI (ASYNC_VIEWS, pollify_api/asgi.py)
+    # the hot paths are served by their native async versions.
+    path(
+        "vote/",
+        (async_views.AsyncVoteCreateView if settings.ASYNC_VIEWS else VoteCreateView).as_view(),
+        name="vote-create",
+    ),
     path("public-polls/", PollListView.as_view(), name="public-polls"),
-    path("public-polls/<uuid:pk>/", PublicPollDetailView.as_view(), name="public-poll-detail"),
-    path("poll-results/", PollResultsView.as_view(), name="poll-results"),
+    path(
+        "public-polls/<uuid:pk>/",
+        (async_views.AsyncPublicPollDetailView if settings.ASYNC_VIEWS else PublicPollDetailView).as_view(),
+        name="public-poll-detail",
+    ),
+    path(
+        "poll-results/",
+        (async_views.AsyncPollResultsView if settings.ASYNC_VIEWS else PollResultsView).as_view(),
+        name="poll-results",
+    ),
     path("public-closed-polls/", PublicClosedPollsView.as_view(), name="public-closed-polls"),
-    path("polls/by-token/", PollByTokenView.as_view(), name="poll-by-token"),
+    path(
+        "polls/by-token/",
+        (async_views.AsyncPollByTokenView if settings.ASYNC_VIEWS else PollByTokenView).as_view(),
+        name="poll-by-token",
+    ),
     path("polls/send-bulk-vote-links/", SendBulkVoteLinksAPIView.as_view(), name="send-bulk-vote-links"),
 
     # Admin analytics & stats
     path("admin/analytics/", AdminAnalyticsView.as_view(), name="admin-analytics"),
+    path("admin/vote-queue/", VoteQueueMetricsView.as_view(), name="admin-vote-queue"),
+    path("admin/results-cache/", ResultsCacheStatsView.as_view(), name="admin-results-cache"),
+    path("admin/metrics/", RequestMetricsView.as_view(), name="admin-metrics"),
+    path("admin/analytics/timeseries/", AdminTimeSeriesView.as_view(), name="admin-analytics-timeseries"),
     path("polls/<uuid:pk>/stats/", PollStatsView.as_view(), name="poll-stats"),
+    path("polls/<uuid:pk>/timeseries/", PollTimeSeriesView.as_view(), name="poll-timeseries"),
+    path("polls/<uuid:pk>/live/", PollLiveResultsView.as_view(), name="poll-live-results"),
+    path("jobs/<uuid:pk>/", JobStatusView.as_view(), name="job-status"),
+    path("jobs/<uuid:pk>/output/", JobOutputView.as_view(), name="job-output"),
+    path("jobs/<uuid:pk>/deliveries/", JobDeliveriesView.as_view(), name="job-deliveries"),
+    path("jobs/<uuid:pk>/deliveries/retry/", RetryDeliveriesView.as_view(), name="job-deliveries-retry"),
+    path("admin/reconcile-votes/", ReconcileVotesView.as_view(), name="admin-reconcile-votes"),
 
     # Poll admin routes (ModelViewSet)
     path("", include(router.urls)),
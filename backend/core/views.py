@@ -1,27 +1,54 @@
 from uuid import uuid4
 
-from django.db.models import Count, Q
+from django.db import transaction
+from django.conf import settings
+from django.db.models import Count, Max, Prefetch, Q, Sum
+from django.db.models.functions import Coalesce
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
 from rest_framework import viewsets, generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from .models import Poll, Vote, VoteLink, User
+from .ingest import is_buffered, ingest_metrics
+from .models import (
+    POLL_STATES, Choice, EmailDelivery, Job, Poll, PollHourlyStats, PollResultsSnapshot, QueuedVote, VoteLink, User,
+    closed_q, upcoming_q, votable_q,
+)
+from . import clock, rollups
+from . import exports, jobs, live, metrics, tokens
+from .imports import detect_format
+from .links import csv_lines, issue_vote_links, link_rows, ndjson_lines, validate_invitees
+from .payloads import POLL_FIELDS, public_poll_payloads
+from .renderers import FastJSONRenderer, PrometheusRenderer
+from .conditional import conditional, conditional_poll, make_etag, stamp_datetime
+from .results_cache import bump_on_commit, cache_stats, catalog_version, get_or_build
+from .pagination import (
+    CreatedAtCursorPagination,
+    DeliveryPagination,
+    EndAtCursorPagination,
+    VoteLinkPagination,
+)
 from .serializers import (
     PollAdminSerializer,
+    PollAdminListSerializer,
     PollPublicSerializer,
+    JobSerializer,
+    EmailDeliverySerializer,
+    ReconcileVotesSerializer,
     VoteLinkSerializer,
     VoteSerializer,
     PollResultsSerializer,
     MyTokenObtainPairSerializer,
 )
 
-from django.core.mail import send_mail, BadHeaderError
 
 
 class PollViewSet(viewsets.ModelViewSet):
@@ -31,6 +58,45 @@ class PollViewSet(viewsets.ModelViewSet):
     queryset = Poll.objects.all().order_by("-created_at")
     serializer_class = PollAdminSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action not in ("list", "retrieve"):
+            return qs
+        qs = qs.with_state().prefetch_related(Prefetch("choices", queryset=Choice.objects.with_tally()))
+        if self.action == "list":
+            state = self.request.query_params.get("state")
+            if state:
+                if state not in POLL_STATES:
+                    raise ValidationError({"state": f"state must be one of {', '.join(POLL_STATES)}."})
+                qs = qs.in_state(state)
+            return qs.annotate(
+                vote_links_count=Count("vote_links"),
+                used_links_count=Count("vote_links", filter=Q(vote_links__used=True)),
+            )
+        return qs.prefetch_related("vote_links")
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return PollAdminListSerializer
+        return super().get_serializer_class()
+
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path="vote-links",
+        permission_classes=[IsAdminUser]
+    )
+    def vote_links(self, request, pk=None):
+        """
+        Paginated invite list for a poll (kept out of the poll list payload).
+        """
+        poll = get_object_or_404(Poll.objects.only("pk"), pk=pk)
+        links = poll.vote_links.all()
+        paginator = VoteLinkPagination()
+        page = paginator.paginate_queryset(links, request, view=self)
+        return paginator.get_paginated_response(VoteLinkSerializer(page, many=True).data)
 
     @action(
         detail=True,
@@ -43,12 +109,15 @@ class PollViewSet(viewsets.ModelViewSet):
         invitee_email = request.data.get("invitee_email")
         invitee_name = request.data.get("invitee_name")
         token = uuid4()
-        vote_link = VoteLink.objects.create(
-            poll=poll,
-            token=token,
-            invitee_email=invitee_email,
-            invitee_name=invitee_name
-        )
+        with transaction.atomic():
+            vote_link = VoteLink.objects.create(
+                poll=poll,
+                token=token,
+                invitee_email=invitee_email,
+                invitee_name=invitee_name
+            )
+            rollups.record_links_issued(poll.id)
+            bump_on_commit(poll.id)
         serializer = VoteLinkSerializer(vote_link)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -59,34 +128,146 @@ class PollViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAdminUser]
     )
     def bulk_generate_links(self, request, pk=None):
+        """
+        Create one vote link per invitee and stream them back as NDJSON
+        (default) or CSV (?output=csv). Nothing is written unless every
+        invitee is valid.
+
+        Batches over BULK_LINKS_INLINE_LIMIT (or any with ?background=1)
+        are queued as a job instead; the links are then downloaded from
+        /api/jobs/<id>/output/.
+        """
         poll = self.get_object()
         invitees = request.data.get("invitees", [])
 
         if not isinstance(invitees, list):
             return Response({"error": "invitees must be a list."}, status=400)
 
-        created_links = []
-        base_url = request.build_absolute_uri("/").rstrip("/")
+        output = request.query_params.get("output", "ndjson")
+        if output not in ("ndjson", "csv"):
+            return Response({"error": "output must be 'ndjson' or 'csv'."}, status=400)
 
-        for person in invitees:
-            email = person.get("email")
-            name = person.get("name")
+        errors = validate_invitees(invitees)
+        if errors:
+            return Response({"error": "Invalid invitees.", "invitees": errors}, status=400)
 
-            link = VoteLink.objects.create(
+        base_url = request.build_absolute_uri("/").rstrip("/")
+        if request.query_params.get("background") or len(invitees) > settings.BULK_LINKS_INLINE_LIMIT:
+            job = jobs.enqueue(
+                "bulk_generate_links",
+                {"invitees": invitees, "output": output, "base_url": base_url},
                 poll=poll,
-                invitee_email=email,
-                invitee_name=name,
-                token=uuid4(),
+                user=request.user,
             )
+            return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        tokens = issue_vote_links(poll, invitees)
+        rows = link_rows(base_url, invitees, tokens)
+
+        if output == "csv":
+            response = StreamingHttpResponse(
+                exports.streaming_body(csv_lines(rows)), content_type="text/csv", status=201
+            )
+            response["Content-Disposition"] = f'attachment; filename="vote-links-{poll.pk}.csv"'
+        else:
+            response = StreamingHttpResponse(
+                exports.streaming_body(ndjson_lines(rows)), content_type="application/x-ndjson", status=201
+            )
+        return response
+
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path="export",
+        permission_classes=[IsAdminUser]
+    )
+    def export(self, request, pk=None):
+        """
+        Stream every vote of the poll with its choice and invitee, oldest
+        first, as CSV (default), NDJSON or Parquet (?output=).
+        """
+        poll = get_object_or_404(Poll.objects.only("pk"), pk=pk)
+        output = request.query_params.get("output", "csv")
+        if output not in exports.FORMATS:
+            return Response(
+                {"error": f"output must be one of: {', '.join(exports.FORMATS)}."}, status=400
+            )
+        try:
+            chunks = exports.export_votes(poll, output)
+        except exports.ExportUnavailable as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        content_type, extension = exports.FORMATS[output]
+        response = StreamingHttpResponse(exports.streaming_body(chunks), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="poll-{poll.pk}-votes.{extension}"'
+        return response
+
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="import-invitees",
+        permission_classes=[IsAdminUser]
+    )
+    def import_invitees(self, request, pk=None):
+        """
+        Queue an import of invitees from an uploaded CSV (email,name header)
+        or NDJSON file in the `file` field. The format comes from ?input= or
+        the file extension. Progress and the summary are at /api/jobs/<id>/.
+        """
+        poll = self.get_object()
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "Upload a file in the 'file' field."}, status=400)
+
+        fmt = detect_format(upload.name, request.query_params.get("input"))
+        if fmt is None:
+            return Response({"error": "input must be 'csv' or 'ndjson'."}, status=400)
+
+        job = jobs.enqueue("import_invitees", {"format": fmt}, poll=poll, user=request.user)
+        # The worker may run on another process; hand the file over through storage.
+        job.payload["path"] = default_storage.save(jobs.input_path(job, fmt), upload)
+        job.save(update_fields=["payload"])
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+def build_public_payload(poll_id):
+    row = Poll.objects.filter(pk=poll_id).values(*POLL_FIELDS).first()
+    if row is None:
+        raise Http404("No Poll matches the given query.")
+    return public_poll_payloads([row])[0], Poll(**row)
+
+
+def public_poll_payload(poll_id):
+    """
+    PollPublicSerializer output for a poll, served from the results cache.
+    """
+    return get_or_build("public-detail", poll_id, lambda: build_public_payload(poll_id))
 
-            created_links.append({
-                "token": str(link.token),
-                "email": email,
-                "name": name,
-                "url": f"{base_url}/vote/{link.token}"
-            })
 
-        return Response({"links": created_links}, status=201)
+def build_results_payload(poll):
+    """
+    Final results from the poll's snapshot when the scheduler has closed
+    it and frozen one for its current end_at, otherwise from the live tallies.
+    """
+    results = None
+    if poll.state == "closed":
+        results = (
+            PollResultsSnapshot.objects.filter(poll=poll, end_at=poll.end_at)
+            .values_list("results", flat=True)
+            .first()
+        )
+    if results is None:
+        results = [
+            {"choice_id": str(c.id), "text": c.text, "votes": c.tally}
+            for c in poll.choices.with_tally()
+        ]
+    payload = {
+        "poll_id": str(poll.id),
+        "title": poll.title,
+        "description": poll.description,
+        "results": results,
+    }
+    return dict(PollResultsSerializer(payload).data), poll
 
 
 class PublicPollDetailView(generics.RetrieveAPIView):
@@ -94,6 +275,14 @@ class PublicPollDetailView(generics.RetrieveAPIView):
     serializer_class = PollPublicSerializer
     permission_classes = [AllowAny]
 
+    def retrieve(self, request, *args, **kwargs):
+        poll = get_object_or_404(
+            Poll.objects.only("pk", "is_active", "start_at", "end_at"), pk=kwargs["pk"]
+        )
+        return conditional_poll(
+            request, poll, "public-detail", lambda: Response(public_poll_payload(poll.pk))
+        )
+
 
 class VoteCreateView(generics.CreateAPIView):
     """
@@ -110,11 +299,25 @@ class VoteCreateView(generics.CreateAPIView):
         }
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
+        if is_buffered():
+            serializer.enqueue()
+            return Response({"message": "Vote received."}, status=status.HTTP_202_ACCEPTED)
         serializer.save()
         return Response({"message": "Vote submitted successfully."}, status=status.HTTP_201_CREATED)
 
 
-class PollListView(generics.ListAPIView):
+class PublicPollListMixin:
+    """
+    List public polls through the hand-built payloads instead of
+    PollPublicSerializer (same JSON, a fraction of the time).
+    """
+
+    def list(self, request, *args, **kwargs):
+        polls = self.get_queryset().with_state().values(*POLL_FIELDS, "currently_votable", "results_visible")
+        return self.get_paginated_response(public_poll_payloads(self.paginate_queryset(polls)))
+
+
+class PollListView(PublicPollListMixin, generics.ListAPIView):
     """
     Public: active polls for voting.
     Only returns polls that are active and currently open.
@@ -122,12 +325,10 @@ class PollListView(generics.ListAPIView):
     queryset = Poll.objects.all()
     serializer_class = PollPublicSerializer
     permission_classes = [AllowAny]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
-        now = timezone.now()
-        qs = Poll.objects.filter(is_active=True, start_at__lte=now)
-        qs = qs.filter(Q(end_at__gte=now) | Q(end_at__isnull=True))
-        return qs.order_by("-created_at")
+        return Poll.objects.in_state("open").order_by("-created_at")
 
 
 class PollResultsView(generics.RetrieveAPIView):
@@ -142,28 +343,24 @@ class PollResultsView(generics.RetrieveAPIView):
         if not token:
             return Response({"error": "token is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            votelink = VoteLink.objects.get(token=token)
-        except VoteLink.DoesNotExist:
+        link = tokens.resolve(token)
+        if link is None:
             return Response({"error": "Invalid vote link."}, status=status.HTTP_404_NOT_FOUND)
 
-        poll = votelink.poll
+        poll = link.poll
         if not poll.show_results:
             return Response({"error": "Results are not available yet."}, status=status.HTTP_403_FORBIDDEN)
 
-        results = [
-            {"choice_id": str(c.id), "text": c.text, "votes": c.votes.count()}
-            for c in poll.choices.all()
-        ]
-
-        payload = {
-            "poll_id": str(poll.id),
-            "title": poll.title,
-            "description": poll.description,
-            "results": results,
-        }
-        serializer = PollResultsSerializer(payload)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return conditional_poll(
+            request,
+            poll,
+            "results",
+            lambda: Response(
+                get_or_build("results", poll.id, lambda: build_results_payload(poll)),
+                status=status.HTTP_200_OK,
+            ),
+            private=True,
+        )
 
 
 class MyTokenObtainPairView(TokenObtainPairView):
@@ -174,75 +371,226 @@ class AdminAnalyticsView(APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        now = timezone.now()
-
-        total_polls = Poll.objects.count()
-        active_polls = Poll.objects.filter(is_active=True).count()
-        closed_polls = Poll.objects.filter(end_at__lt=now).count()
-        votable_polls = Poll.objects.filter(is_active=True, start_at__lte=now).filter(
-            Q(end_at__gte=now) | Q(end_at__isnull=True)
-        ).count()
-        upcoming_polls = Poll.objects.filter(
-            is_active=True, start_at__gt=now).count()
-
-        total_votes = Vote.objects.count()
-        todays_votes = Vote.objects.filter(created_at__date=now.date()).count()
-        unique_voters = Vote.objects.values('votelink').distinct().count()
-
-        most_voted_poll = Poll.objects.annotate(
-            vote_count=Count("votes")).order_by("-vote_count").first()
-        least_voted_poll = Poll.objects.annotate(
-            vote_count=Count("votes")).order_by("vote_count").first()
-
-        total_votelinks = VoteLink.objects.count()
-        used_votelinks = VoteLink.objects.filter(used=True).count()
+        now = clock.now()
+        today = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        last_week = now - timezone.timedelta(days=7)
+
+        # Poll states and the overall vote total in one conditional aggregate.
+        # Vote totals come from the choice tallies, not from counting votes.
+        poll_stats = Poll.objects.with_vote_total().aggregate(
+            total_polls=Count("pk"),
+            active_polls=Count("pk", filter=Q(is_active=True)),
+            closed_polls=Count("pk", filter=closed_q(now)),
+            votable_polls=Count("pk", filter=votable_q(now)),
+            upcoming_polls=Count("pk", filter=upcoming_q(now)),
+            recent_polls_count=Count("pk", filter=Q(created_at__gte=last_week)),
+            total_votes=Coalesce(Sum("vote_total"), 0),
+        )
+
+        # Link totals are counted exactly: links are also created outside
+        # the instrumented API paths (e.g. the admin inline), which the
+        # rollups only pick up on backfill. Each used link is one voter.
+        links = VoteLink.objects.aggregate(
+            total_votelinks=Count("pk"),
+            used_votelinks=Count("pk", filter=Q(used=True)),
+        )
+        total_votelinks = links["total_votelinks"]
+        used_votelinks = links["used_votelinks"]
+        todays_votes = PollHourlyStats.objects.filter(hour__gte=today).aggregate(
+            total=Coalesce(Sum("votes"), 0)
+        )["total"]
         votelink_usage_percent = round(
             (used_votelinks / total_votelinks) * 100, 2) if total_votelinks else 0
 
+        ranked = Poll.objects.with_vote_total().values_list("title", flat=True)
+        most_voted_poll = ranked.order_by("-vote_total").first()
+        least_voted_poll = ranked.order_by("vote_total").first()
+
         total_users = User.objects.count()
-        last_week = now - timezone.timedelta(days=7)
-        recent_polls_count = Poll.objects.filter(
-            created_at__gte=last_week).count()
 
         data = {
-            "total_polls": total_polls,
-            "active_polls": active_polls,
-            "closed_polls": closed_polls,
-            "votable_polls": votable_polls,
-            "upcoming_polls": upcoming_polls,
-            "total_votes": total_votes,
+            "total_polls": poll_stats["total_polls"],
+            "active_polls": poll_stats["active_polls"],
+            "closed_polls": poll_stats["closed_polls"],
+            "votable_polls": poll_stats["votable_polls"],
+            "upcoming_polls": poll_stats["upcoming_polls"],
+            "total_votes": poll_stats["total_votes"],
             "todays_votes": todays_votes,
-            "unique_voters": unique_voters,
-            "most_voted_poll": most_voted_poll.title if most_voted_poll else None,
-            "least_voted_poll": least_voted_poll.title if least_voted_poll else None,
+            "unique_voters": used_votelinks,
+            "most_voted_poll": most_voted_poll,
+            "least_voted_poll": least_voted_poll,
             "total_votelinks": total_votelinks,
             "used_votelinks": used_votelinks,
             "votelink_usage_percent": votelink_usage_percent,
             "total_users": total_users,
-            "recent_polls_count": recent_polls_count,
+            "recent_polls_count": poll_stats["recent_polls_count"],
         }
 
         return Response(data)
 
 
+class ResultsCacheStatsView(APIView):
+    """
+    Hit/miss counters for the results and token caches (this process only).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({**cache_stats(), "tokens": tokens.resolver.stats()})
+
+
+class RequestMetricsView(APIView):
+    """
+    Per-view latency histograms, query counts and DB time of sampled
+    requests, plus recent requests over the query budget (this process only).
+    """
+    permission_classes = [IsAdminUser]
+    renderer_classes = [FastJSONRenderer, PrometheusRenderer]
+
+    def get(self, request):
+        return Response(metrics.registry.snapshot())
+
+
+class VoteQueueMetricsView(APIView):
+    """
+    Buffered vote ingestion: queue depth and flush latency.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(ingest_metrics())
+
+
 class PollStatsView(APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request, pk):
-        poll = get_object_or_404(Poll, pk=pk)
-        stats = [
-            {"choice_id": str(c.id), "text": c.text, "votes": c.votes.count()}
-            for c in poll.choices.all()
-        ]
-        return Response({"poll": poll.title, "stats": stats})
+        def build():
+            poll = get_object_or_404(Poll, pk=pk)
+            stats = [
+                {"choice_id": str(c.id), "text": c.text, "votes": c.tally}
+                for c in poll.choices.with_tally()
+            ]
+            return {
+                "poll": poll.title,
+                "stats": stats,
+                "total_votes": sum(row["votes"] for row in stats),
+            }, poll
+
+        payload = get_or_build("stats", pk, build)
+        # Day-relative and link counts are read fresh: they change at
+        # midnight and when workers issue links, without a version bump here.
+        today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        activity = PollHourlyStats.objects.filter(poll_id=pk).aggregate(
+            todays_votes=Coalesce(Sum("votes", filter=Q(hour__gte=today)), 0),
+            links_issued=Coalesce(Sum("links_issued"), 0),
+        )
+        return Response({**payload, **activity})
 
 
-class PublicClosedPollsView(generics.ListAPIView):
+class PollLiveResultsView(APIView):
+    """
+    Server-Sent Events stream of a poll's tallies: a `snapshot` event, then
+    `tally` events with the changed choices' votes and deltas. Without
+    ASYNC_VIEWS (sync workers) it answers one snapshot and the client polls.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, pk):
+        get_object_or_404(Poll.objects.only("pk"), pk=pk)
+        if settings.ASYNC_VIEWS:
+            response = StreamingHttpResponse(live.aevent_stream(pk), content_type="text/event-stream")
+        else:
+            response = HttpResponse(live.poll_response_body(pk), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class TimeSeriesMixin:
+    """
+    Parses ?interval=hour|day&days=N for the rollup time-series endpoints.
+    """
+    max_days = 365
+
+    def series_params(self, request):
+        interval = request.query_params.get("interval", "day")
+        if interval not in rollups.INTERVALS:
+            return None, None, Response(
+                {"error": "interval must be 'hour' or 'day'."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            days = int(request.query_params.get("days", 7))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= self.max_days:
+            return None, None, Response(
+                {"error": f"days must be between 1 and {self.max_days}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return interval, days, None
+
+
+class AdminTimeSeriesView(TimeSeriesMixin, APIView):
+    """
+    Votes and links issued per hour/day across all polls.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        interval, days, error = self.series_params(request)
+        if error:
+            return error
+        return Response({
+            "interval": interval,
+            "series": rollups.series(interval, days),
+        })
+
+
+class PollTimeSeriesView(TimeSeriesMixin, APIView):
+    """
+    Votes and links issued per hour/day for one poll.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, pk):
+        poll = get_object_or_404(Poll.objects.only("pk", "title"), pk=pk)
+        interval, days, error = self.series_params(request)
+        if error:
+            return error
+        return Response({
+            "poll": poll.title,
+            "interval": interval,
+            "series": rollups.series(interval, days, poll=poll),
+        })
+
+
+class PublicClosedPollsView(PublicPollListMixin, generics.ListAPIView):
     serializer_class = PollPublicSerializer
     permission_classes = [AllowAny]
+    pagination_class = EndAtCursorPagination
 
     def get_queryset(self):
-        return Poll.objects.filter(end_at__lt=timezone.now()).order_by("-end_at")
+        return Poll.objects.in_state("closed").order_by("-end_at")
+
+    def list(self, request, *args, **kwargs):
+        # The closed set only changes when a poll closes or any poll is edited,
+        # so (count, latest end_at, catalog version) identifies the page.
+        summary = Poll.objects.in_state("closed").aggregate(
+            count=Count("pk"), last_closed=Max("end_at")
+        )
+        version = catalog_version()
+        last_modified = stamp_datetime(version)
+        if summary["last_closed"]:
+            last_modified = max(last_modified, summary["last_closed"])
+        render = super().list
+        return conditional(
+            request,
+            make_etag("closed-polls", version, summary["count"], summary["last_closed"], request.GET.urlencode()),
+            last_modified,
+            lambda: render(request, *args, **kwargs),
+            max_age=settings.CLOSED_POLLS_LIST_MAX_AGE,
+        )
 
 
 class PollByTokenView(APIView):
@@ -257,48 +605,135 @@ class PollByTokenView(APIView):
         if not token:
             return Response({"error": "Token is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            votelink = VoteLink.objects.get(token=token)
-        except VoteLink.DoesNotExist:
+        link = tokens.resolve(token)
+        if link is None:
             return Response({"error": "Invalid token."}, status=status.HTTP_404_NOT_FOUND)
 
-        poll = votelink.poll
-        data = PollPublicSerializer(poll).data
-        data["has_voted"] = votelink.used
+        has_voted = link.used or (
+            is_buffered() and QueuedVote.objects.filter(token=link.token).exists()
+        )
+
+        def build():
+            data = dict(public_poll_payload(link.poll.pk))
+            data["has_voted"] = has_voted
+            return Response(data)
+
+        return conditional_poll(
+            request, link.poll, "by-token", build, extra=has_voted, private=True
+        )
+
+class JobStatusView(generics.RetrieveAPIView):
+    permission_classes = [IsAdminUser]
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+
+
+class JobOutputView(APIView):
+    """
+    Download the file a finished job produced (e.g. background bulk links).
+    """
+    permission_classes = [IsAdminUser]
+    content_types = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+    def get(self, request, pk):
+        job = get_object_or_404(Job, pk=pk, status=Job.SUCCEEDED)
+        path = (job.result or {}).get("output")
+        if not path or not default_storage.exists(path):
+            raise Http404("This job has no output.")
+        extension = path.rsplit(".", 1)[-1]
+        return FileResponse(
+            default_storage.open(path, "rb"),
+            as_attachment=True,
+            filename=f"{job.kind}-{job.pk}.{extension}",
+            content_type=self.content_types.get(extension, "application/octet-stream"),
+        )
+
+
+class ReconcileVotesView(APIView):
+    """
+    Queue `reconcile_vote_counts` (body: optional poll, dry_run, fold_shards).
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = ReconcileVotesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        payload = dict(serializer.validated_data)
+        if "poll" in payload:
+            payload["poll"] = str(payload["poll"])
+        job = jobs.enqueue("reconcile_vote_counts", payload, user=request.user)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
-        return Response(data)
 
 class SendBulkVoteLinksAPIView(APIView):
-    permission_classes = [IsAdminUser] 
+    permission_classes = [IsAdminUser]
 
     def post(self, request):
+        """
+        Queue the invitation emails. Each recipient gets an EmailDelivery
+        row; outcomes are listed at /api/jobs/<id>/deliveries/.
+        """
         invitees = request.data.get("invitees", [])
         poll_title = request.data.get("poll_title", "Poll")
-        sent_emails = []
 
         if not isinstance(invitees, list):
             return Response({"error": "Invitees must be a list."}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(inv, dict) for inv in invitees):
+            return Response({"error": "Each invitee must be an object."}, status=status.HTTP_400_BAD_REQUEST)
+
+        recipients = [inv for inv in invitees if inv.get("email") and inv.get("link")]
+        with transaction.atomic():
+            job = jobs.enqueue("send_vote_links", {"poll_title": poll_title}, user=request.user)
+            EmailDelivery.objects.bulk_create(
+                (
+                    EmailDelivery(
+                        job=job,
+                        email=str(inv["email"]),
+                        name=str(inv.get("name") or "")[:255],
+                        link=str(inv["link"]),
+                    )
+                    for inv in recipients
+                ),
+                batch_size=1000,
+            )
+        return Response(
+            {"status": "queued", "skipped": len(invitees) - len(recipients), "job": JobSerializer(job).data},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class JobDeliveriesView(generics.ListAPIView):
+    """
+    Per-recipient outcomes of a bulk email job (?status=failed to filter).
+    """
+    permission_classes = [IsAdminUser]
+    serializer_class = EmailDeliverySerializer
+    pagination_class = DeliveryPagination
+
+    def get_queryset(self):
+        deliveries = EmailDelivery.objects.filter(job_id=self.kwargs["pk"])
+        delivery_status = self.request.query_params.get("status")
+        if delivery_status:
+            deliveries = deliveries.filter(status=delivery_status)
+        return deliveries
+
+
+class RetryDeliveriesView(APIView):
+    """
+    Mark a bulk email job's failed deliveries pending and queue it again.
+    """
+    permission_classes = [IsAdminUser]
 
-        for inv in invitees:
-            name = inv.get("name", "Guest")
-            email = inv.get("email")
-            link = inv.get("link")
-
-            if not email or not link:
-                continue  # skip invalid entries
-
-            try:
-                send_mail(
-                    subject=f"You're invited to vote: {poll_title}",
-                    message=f"Hi {name},\nVote here: {link}",
-                    from_email="no-reply@pollify.com",
-                    recipient_list=[email],
-                    fail_silently=False,  # raise errors if any
-                )
-                sent_emails.append(email)
-            except BadHeaderError:
-                return Response({"error": "Invalid header found."}, status=status.HTTP_400_BAD_REQUEST)
-            except Exception as e:
-                return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        return Response({"status": "emails sent", "sent_emails": sent_emails})
+    def post(self, request, pk):
+        job = get_object_or_404(Job, pk=pk, kind="send_vote_links")
+        if job.status in (Job.QUEUED, Job.RUNNING):
+            return Response({"error": "Job is still in progress."}, status=status.HTTP_409_CONFLICT)
+        retried = job.deliveries.filter(status=EmailDelivery.FAILED).update(
+            status=EmailDelivery.PENDING, error=""
+        )
+        if retried:
+            jobs.requeue(job)
+        return Response(
+            {"retried": retried, "job": JobSerializer(job).data},
+            status=status.HTTP_202_ACCEPTED if retried else status.HTTP_200_OK,
+        )
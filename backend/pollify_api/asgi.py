@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Under ASGI the public vote/poll-read endpoints use the native async views in
+core.async_views (ASYNC_VIEWS). Serve it with gunicorn_asgi.py:
+
+    gunicorn -c pollify_api/gunicorn_asgi.py pollify_api.asgi:application
 """
 
 import os
@@ -12,5 +17,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pollify_api.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
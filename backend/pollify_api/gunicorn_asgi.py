@@ -0,0 +1,16 @@
+"""
+Gunicorn settings for serving the ASGI app with uvicorn workers:
+
+    gunicorn -c pollify_api/gunicorn_asgi.py pollify_api.asgi:application
+
+Each worker is one event loop, so a handful of workers (WEB_CONCURRENCY)
+replaces the many sync workers the WSGI setup needs for the same load.
+Requires the uvicorn-worker package.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "uvicorn_worker.UvicornWorker"
+keepalive = 5
+graceful_timeout = 30
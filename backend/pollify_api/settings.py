@@ -55,7 +55,11 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'core.User'
 
 MIDDLEWARE = [
+    # Sampled per-view latency and query metrics (core/metrics.py).
+    'core.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # One "now" per request for poll state checks (core/clock.py).
+    'core.clock.RequestClockMiddleware',
      'whitenoise.middleware.WhiteNoiseMiddleware', 
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -86,18 +90,55 @@ TEMPLATES = [
 WSGI_APPLICATION = 'pollify_api.wsgi.application'
 
 
+# Serve the public vote/poll-read endpoints with native async views. Set by
+# pollify_api/asgi.py; WSGI deployments keep the sync DRF views.
+ASYNC_VIEWS = os.environ.get("ASYNC_VIEWS", "False") == "True"
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Under ASGI each request's sync ORM work runs on its own thread, so
+# persistent connections would pile up; they are closed per request instead.
 DATABASES = {
     'default': dj_database_url.config(
         default=os.environ.get(
             'DATABASE_URL', f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
-        conn_max_age=600,
+        conn_max_age=0 if ASYNC_VIEWS else 600,
     )
 }
 
 
+# Cache
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) in production.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "pollify"),
+    }
+}
+
+# Max seconds to cache results/stats for polls that are still open, and for
+# closed polls. Closed polls can still change (late buffered flushes, edits),
+# and with the default per-process cache other processes' version bumps are
+# not seen here, so their entries are bounded too.
+RESULTS_CACHE_TIMEOUT = int(os.environ.get("RESULTS_CACHE_TIMEOUT", 60))
+CLOSED_RESULTS_CACHE_TIMEOUT = int(os.environ.get("CLOSED_RESULTS_CACHE_TIMEOUT", 300))
+
+# Cache-Control max-age for public poll responses; clients revalidate with
+# the ETag afterwards. Closed polls change rarely but can still change.
+OPEN_POLL_MAX_AGE = int(os.environ.get("OPEN_POLL_MAX_AGE", 5))
+CLOSED_POLL_MAX_AGE = int(os.environ.get("CLOSED_POLL_MAX_AGE", 60))
+CLOSED_POLLS_LIST_MAX_AGE = int(os.environ.get("CLOSED_POLLS_LIST_MAX_AGE", 60))
+
+# Per-process cache of vote link tokens (see core/tokens.py). Another
+# process can report a used link as unused for up to TOKEN_CACHE_TTL.
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 50_000))
+TOKEN_CACHE_TTL = float(os.environ.get("TOKEN_CACHE_TTL", 10))
+TOKEN_NEGATIVE_TTL = float(os.environ.get("TOKEN_NEGATIVE_TTL", 300))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -144,9 +185,22 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    # orjson-backed JSON with a stdlib fallback (core/renderers.py).
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+# Default page size for the cursor-paginated list endpoints (?page_size= overrides).
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 20))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Pollify API',
     'DESCRIPTION': 'API documentation for the Pollify backend.',
@@ -179,7 +233,51 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Live tallies (SSE): how often watched polls are re-read, how often an idle
+# stream sends a keep-alive, and how long one stream lasts before the browser
+# reconnects. Streams are only held open under ASGI; on sync WSGI workers the
+# endpoint returns one snapshot and the browser polls every
+# LIVE_RESULTS_POLL_INTERVAL seconds instead.
+LIVE_RESULTS_INTERVAL = float(os.environ.get("LIVE_RESULTS_INTERVAL", 1.0))
+LIVE_RESULTS_HEARTBEAT = float(os.environ.get("LIVE_RESULTS_HEARTBEAT", 15))
+LIVE_RESULTS_STREAM_SECONDS = float(os.environ.get("LIVE_RESULTS_STREAM_SECONDS", 600))
+LIVE_RESULTS_POLL_INTERVAL = float(os.environ.get("LIVE_RESULTS_POLL_INTERVAL", 5))
+
+# Vote ingestion: "sync" writes each vote in the request; "buffered" stages
+# votes and returns 202, with `manage.py flush_votes` writing them in batches.
+VOTE_INGESTION_MODE = os.environ.get("VOTE_INGESTION_MODE", "sync")
+
+# Bulk link requests above this many invitees are queued as a background job
+# (see `manage.py run_workers`) instead of being streamed back inline.
+BULK_LINKS_INLINE_LIMIT = int(os.environ.get("BULK_LINKS_INLINE_LIMIT", 10_000))
+
+# Invitee imports dedupe emails with a Bloom filter sized for this many rows
+# (about 1.8 MB at the default); larger files still work, with more
+# false positives falling through to a database check.
+INVITEE_IMPORT_DEDUPE_CAPACITY = int(os.environ.get("INVITEE_IMPORT_DEDUPE_CAPACITY", 1_000_000))
+
+# Rows fetched per round trip when streaming a poll's vote export.
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 2000))
+
+# Request metrics: share of requests timed and counted (0 disables), and the
+# query count above which a sampled request is logged as over budget.
+METRICS_SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE", 0.1))
+METRICS_QUERY_BUDGET = int(os.environ.get("METRICS_QUERY_BUDGET", 30))
+
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 DEFAULT_FROM_EMAIL = "no-reply@pollify.com"
 
 EMAIL_FILE_PATH = BASE_DIR / "sent_emails"  # folder where emails are saved
+
+# Job queue: how often a worker refreshes a running job's heartbeat, and how
+# long without one before another worker reclaims the job.
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get("JOB_HEARTBEAT_INTERVAL", 30))
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", 120))
+
+# Bulk invitation sends: worker threads (one reused connection each), overall
+# messages/second (0 = unlimited), recipients per batch, and tries per
+# recipient before it is marked failed.
+BULK_EMAIL_WORKERS = int(os.environ.get("BULK_EMAIL_WORKERS", 4))
+BULK_EMAIL_RATE = float(os.environ.get("BULK_EMAIL_RATE", 0))
+BULK_EMAIL_BATCH_SIZE = int(os.environ.get("BULK_EMAIL_BATCH_SIZE", 50))
+BULK_EMAIL_MAX_ATTEMPTS = int(os.environ.get("BULK_EMAIL_MAX_ATTEMPTS", 3))
@@ -1,13 +1,36 @@
+import type { AxiosInstance } from "axios";
 import { CreatePollPayload } from "@/Interfaces/interface";
 import adminApi from "./adminApi";
 import publicApi from "./publicApi";
 
+// List endpoints are cursor-paginated: { next, previous, results }.
+// Follow `next` (an absolute URL) until the last page.
+const getAllPages = async (api: AxiosInstance, url: string) => {
+  const results: any[] = [];
+  let next: string | null = url;
+  while (next) {
+    const res = await api.get(next);
+    results.push(...res.data.results);
+    next = res.data.next;
+  }
+  return results;
+};
+
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Poll a background job until it finishes; rejects if it failed.
+const waitForJob = async (jobId: string) => {
+  for (;;) {
+    const res = await adminApi.get(`/jobs/${jobId}/`);
+    if (res.data.status === "succeeded") return res.data;
+    if (res.data.status === "failed") throw new Error(res.data.error || "Link generation failed.");
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+};
+
 export const PollService = {
   // ===== Admin Polls =====
-  getAll: async () => {
-    const res = await adminApi.get("/polls/");
-    return res.data;
-  },
+  getAll: async () => getAllPages(adminApi, "/polls/"),
 
   getById: async (pollId: string) => {
     const res = await adminApi.get(`/polls/${pollId}/`);
@@ -34,9 +57,25 @@ export const PollService = {
     return res.data;
   },
 
+  // Streams one JSON object per line (NDJSON). Large batches answer 202 with
+  // a background job instead; wait for it and download its NDJSON output.
   bulkGenerateVoteLinks: async (pollId: string, invitees: { email: string; name: string }[]) => {
-    const res = await adminApi.post(`/polls/${pollId}/bulk-generate-links/`, { invitees });
-    return res.data;
+    const res = await adminApi.post(
+      `/polls/${pollId}/bulk-generate-links/`,
+      { invitees },
+      { responseType: "text" }
+    );
+    let body = res.data as string;
+    if (res.status === 202) {
+      const job = await waitForJob(JSON.parse(body).id);
+      const output = await adminApi.get(`/jobs/${job.id}/output/`, { responseType: "text" });
+      body = output.data as string;
+    }
+    const links = body
+      .split("\n")
+      .filter((line) => line.trim())
+      .map((line) => JSON.parse(line));
+    return { links };
   },
 
    sendBulkVoteEmails: async (pollTitle: string, invitees: { name: string; email: string; link: string }[]) => {
@@ -59,20 +98,14 @@ export const PollService = {
   },
   
   // ===== Public Polls =====
-  getPublicPolls: async () => {
-    const res = await publicApi.get("/public-polls/");
-    return res.data;
-  },
+  getPublicPolls: async () => getAllPages(publicApi, "/public-polls/"),
 
   getPublicPollById: async (pollId: string) => {
     const res = await publicApi.get(`/public-polls/${pollId}/`);
     return res.data;
   },
 
-  getPublicClosedPolls: async () => {
-    const res = await publicApi.get("/public-closed-polls/");
-    return res.data;
-  },
+  getPublicClosedPolls: async () => getAllPages(publicApi, "/public-closed-polls/"),
 
   // ===== Results =====
   getPollResults: async (token: string) => {